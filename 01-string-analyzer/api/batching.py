@@ -0,0 +1,150 @@
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+
+from .models import AnalyzedString, StringTableVersion
+
+logger = logging.getLogger(__name__)
+
+
+class PendingInsert:
+    """A single string waiting for the next group commit."""
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.created = False
+        self.error = None
+        self.done = threading.Event()
+
+
+class InsertBatcher:
+    """
+    Write-behind batching for single-item string inserts.
+
+    Request threads hand over an analyzed (but unsaved) instance and block
+    until a background writer thread has committed it. The writer gathers
+    inserts for a short window and writes them with one bulk_create in a
+    single transaction, so concurrent POSTs share one lock and one fsync.
+    """
+
+    def __init__(self, window_ms=5, max_batch_size=256, wait_timeout=30):
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.wait_timeout = wait_timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, instance):
+        """
+        Queue an instance for insertion and wait for its batch to commit.
+
+        Returns the saved instance, or raises IntegrityError if the string
+        already exists, matching AnalyzedString.objects.create().
+        """
+        if not instance.id:
+            instance.compute_properties()
+
+        pending = PendingInsert(instance)
+        self._ensure_started()
+        self._queue.put(pending)
+
+        if not pending.done.wait(self.wait_timeout):
+            raise TimeoutError("Timed out waiting for batched insert to commit")
+        if pending.error is not None:
+            raise pending.error
+        if not pending.created:
+            raise IntegrityError("String already exists in the system")
+        return instance
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='string-insert-batcher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            close_old_connections()
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"Batched insert of {len(batch)} strings failed: {str(e)}")
+                for pending in batch:
+                    if not pending.done.is_set():
+                        pending.error = e
+            finally:
+                for pending in batch:
+                    pending.done.set()
+
+    def _write_batch(self, batch):
+        # Duplicates inside the batch: the first submission wins
+        unique = {}
+        for pending in batch:
+            unique.setdefault(pending.instance.id, pending)
+
+        existing = self._existing_ids(list(unique))
+        to_insert = [p for key, p in unique.items() if key not in existing]
+
+        try:
+            with transaction.atomic():
+                AnalyzedString.objects.bulk_create([p.instance for p in to_insert])
+                # bulk_create doesn't send post_save, so bump the version here
+                if to_insert:
+                    StringTableVersion.bump(len(to_insert))
+        except IntegrityError:
+            # A row was written outside the batcher in the meantime;
+            # fall back to per-row inserts so each request gets its own result.
+            self._write_individually(to_insert)
+            return
+
+        for pending in to_insert:
+            pending.created = True
+
+    @staticmethod
+    def _existing_ids(ids):
+        return set(AnalyzedString.objects.filter(id__in=ids).values_list('id', flat=True))
+
+    def _write_individually(self, pending_inserts):
+        with transaction.atomic():
+            for pending in pending_inserts:
+                try:
+                    with transaction.atomic():
+                        pending.instance.save(force_insert=True)
+                    pending.created = True
+                except IntegrityError:
+                    pending.created = False
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_insert_batcher():
+    """Return the process-wide batcher, created from settings on first use."""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = InsertBatcher(
+                window_ms=settings.STRING_INSERT_BATCH_WINDOW_MS,
+                max_batch_size=settings.STRING_INSERT_BATCH_MAX_SIZE,
+            )
+        return _batcher
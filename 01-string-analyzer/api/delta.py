@@ -0,0 +1,83 @@
+import hashlib
+
+from .models import AnalyzedString
+
+
+class DeltaError(ValueError):
+    """Raised when edit operations cannot be applied to the base string."""
+
+    pass
+
+
+def _token_bounds(value, start, end):
+    """
+    Widen [start, end) to the surrounding whitespace boundaries so that the
+    words inside the window are independent of the rest of the string.
+    """
+    while start > 0 and not value[start - 1].isspace():
+        start -= 1
+    while end < len(value) and not value[end].isspace():
+        end += 1
+    return start, end
+
+
+def apply_delta(base, operations):
+    """
+    Build an unsaved AnalyzedString from a base row and a list of edits.
+
+    Each operation is a dict with 'op' (insert, delete or replace),
+    'position', and 'length' and/or 'text', applied in order to the result
+    of the previous one. Length, unique characters, word count and the
+    character frequency map are derived from the base row by only looking
+    at the edited regions; the hash and palindrome check still scan the
+    full new value.
+    """
+    value = base.value
+    length = base.length
+    word_count = base.word_count
+    char_freq = dict(base.character_frequency_map)
+
+    for operation in operations:
+        op = operation['op']
+        position = operation['position']
+        removed_length = operation.get('length', 0) if op != 'insert' else 0
+        text = operation.get('text', '') if op != 'delete' else ''
+
+        if position > len(value) or position + removed_length > len(value):
+            raise DeltaError(
+                f"Operation {op} at position {position} is outside the string (length {len(value)})"
+            )
+
+        removed = value[position:position + removed_length]
+
+        # Words can only change within the tokens touching the edit
+        window_start, window_end = _token_bounds(value, position, position + removed_length)
+        old_window = value[window_start:window_end]
+        new_window = value[window_start:position] + text + value[position + removed_length:window_end]
+        word_count += len(new_window.split()) - len(old_window.split())
+
+        for char in removed:
+            char_freq[char] -= 1
+            if not char_freq[char]:
+                del char_freq[char]
+        for char in text:
+            char_freq[char] = char_freq.get(char, 0) + 1
+
+        length += len(text) - removed_length
+        value = value[:position] + text + value[position + removed_length:]
+
+    if not value:
+        raise DeltaError("Edits produce an empty string")
+
+    instance = AnalyzedString(value=value)
+    instance.sha256_hash = hashlib.sha256(value.encode('utf-8')).hexdigest()
+    instance.id = instance.sha256_hash
+
+    cleaned_value = value.lower()
+    instance.is_palindrome = cleaned_value == cleaned_value[::-1]
+
+    instance.length = length
+    instance.word_count = word_count
+    instance.unique_characters = len(char_freq)
+    instance.character_frequency_map = char_freq
+    return instance
@@ -0,0 +1,98 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from api.batching import get_insert_batcher
+from api.models import AnalyzedString
+
+
+class Command(BaseCommand):
+    help = 'Measure POST /strings throughput with and without group commit'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=64)
+        parser.add_argument('--requests-per-client', type=int, default=50)
+        parser.add_argument(
+            '--duplicate-every', type=int, default=10,
+            help='Every Nth request re-posts an existing value (expects 409). 0 disables.'
+        )
+        parser.add_argument(
+            '--mode', choices=['direct', 'batched', 'both'], default='both'
+        )
+
+    def handle(self, *args, **options):
+        modes = ['direct', 'batched'] if options['mode'] == 'both' else [options['mode']]
+        results = {}
+
+        # 409s are expected here; keep django.request from logging each one
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        for mode in modes:
+            run_id = uuid.uuid4().hex[:8]
+            try:
+                with override_settings(STRING_INSERT_BATCHING=(mode == 'batched')):
+                    results[mode] = self._run(run_id, options)
+            finally:
+                AnalyzedString.objects.filter(value__startswith=f'bench-{run_id}-').delete()
+
+            self.stdout.write(
+                f"{mode:>8}: {results[mode]['requests_per_second']:.1f} req/s "
+                f"({results[mode]['requests']} requests in {results[mode]['seconds']:.2f}s) "
+                f"statuses={results[mode]['statuses']}"
+            )
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def _run(self, run_id, options):
+        url = reverse('string-list-create')
+        clients = options['clients']
+        per_client = options['requests_per_client']
+        duplicate_every = options['duplicate_every']
+
+        statuses = Counter()
+        statuses_lock = threading.Lock()
+        start_barrier = threading.Barrier(clients + 1)
+
+        if options['mode'] != 'direct':
+            # Start the writer thread outside the timed section
+            get_insert_batcher()._ensure_started()
+
+        def worker(client_index):
+            client = Client(raise_request_exception=False)
+            local = Counter()
+            start_barrier.wait()
+            for i in range(per_client):
+                if duplicate_every and i and i % duplicate_every == 0:
+                    value = f'bench-{run_id}-{client_index}-0'
+                else:
+                    value = f'bench-{run_id}-{client_index}-{i}'
+                response = client.post(url, {'value': value}, content_type='application/json')
+                local[response.status_code] += 1
+            with statuses_lock:
+                statuses.update(local)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(clients)]
+        for thread in threads:
+            thread.start()
+
+        start_barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        total = clients * per_client
+        return {
+            'clients': clients,
+            'requests': total,
+            'seconds': round(elapsed, 4),
+            'requests_per_second': round(total / elapsed, 2),
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        }
@@ -0,0 +1,126 @@
+import copy
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.models import AnalyzedString
+
+BENCH_ALIAS = 'sqlite_bench'
+
+
+class Command(BaseCommand):
+    help = 'Compare SQLite connection profiles under a mixed read/write workload'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+', default=list(settings.SQLITE_PROFILES),
+            choices=list(settings.SQLITE_PROFILES),
+        )
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per profile')
+        parser.add_argument('--seed-rows', type=int, default=5000)
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Fraction of operations that are inserts'
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        for profile in options['profiles']:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                self._configure_alias(profile, os.path.join(tmpdir, 'bench.sqlite3'))
+                try:
+                    call_command('migrate', database=BENCH_ALIAS, verbosity=0)
+                    self._seed(options['seed_rows'])
+                    results[profile] = self._run(options)
+                finally:
+                    connections[BENCH_ALIAS].close()
+                    del connections[BENCH_ALIAS]
+                    del connections.settings[BENCH_ALIAS]
+
+            summary = results[profile]
+            self.stdout.write(
+                f"{profile:>8}: {summary['ops_per_second']:.1f} ops/s "
+                f"(reads {summary['reads_per_second']:.1f}/s, "
+                f"writes {summary['writes_per_second']:.1f}/s, errors {summary['errors']})"
+            )
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def _configure_alias(self, profile, path):
+        """Register a throwaway database using the given PRAGMA profile and transaction mode."""
+        config = copy.deepcopy(connections.settings['default'])
+        config['NAME'] = path
+        config['OPTIONS']['init_command'] = ';'.join(
+            f'PRAGMA {pragma}={value}'
+            for pragma, value in settings.SQLITE_PROFILES[profile].items()
+        )
+        config['OPTIONS']['transaction_mode'] = settings.SQLITE_TRANSACTION_MODES[profile]
+        connections.settings[BENCH_ALIAS] = config
+
+    def _seed(self, count):
+        rows = []
+        for i in range(count):
+            instance = AnalyzedString(value=f'seed {i} ' + 'abc ' * random.randint(0, 20))
+            instance.compute_properties()
+            rows.append(instance)
+        AnalyzedString.objects.using(BENCH_ALIAS).bulk_create(rows, batch_size=500)
+
+    def _run(self, options):
+        counts = Counter()
+        counts_lock = threading.Lock()
+        stop_at = []
+        start_barrier = threading.Barrier(options['threads'] + 1)
+        write_ratio = options['write_ratio']
+
+        def worker(worker_index):
+            local = Counter()
+            rng = random.Random(worker_index)
+            queryset = AnalyzedString.objects.using(BENCH_ALIAS)
+            start_barrier.wait()
+            i = 0
+            while time.perf_counter() < stop_at[0]:
+                try:
+                    if rng.random() < write_ratio:
+                        queryset.create(value=f'write {worker_index}-{i}')
+                        local['writes'] += 1
+                    else:
+                        # Same shape as GET /strings?is_palindrome=false&min_length=N
+                        list(queryset.filter(is_palindrome=False, length__gte=rng.randint(0, 80))[:50])
+                        local['reads'] += 1
+                except Exception:
+                    local['errors'] += 1
+                i += 1
+            connections[BENCH_ALIAS].close()
+            with counts_lock:
+                counts.update(local)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+
+        stop_at.append(time.perf_counter() + options['duration'])
+        start_barrier.wait()
+        for thread in threads:
+            thread.join()
+
+        duration = options['duration']
+        return {
+            'threads': options['threads'],
+            'seconds': duration,
+            'reads': counts['reads'],
+            'writes': counts['writes'],
+            'errors': counts['errors'],
+            'ops_per_second': round((counts['reads'] + counts['writes']) / duration, 2),
+            'reads_per_second': round(counts['reads'] / duration, 2),
+            'writes_per_second': round(counts['writes'] / duration, 2),
+        }
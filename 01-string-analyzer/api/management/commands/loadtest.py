@@ -0,0 +1,241 @@
+import itertools
+import json
+import platform
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+NATURAL_LANGUAGE_QUERIES = [
+    'all single word palindromic strings',
+    'strings longer than 10 characters',
+    'strings containing the letter z',
+    'palindromic strings with two words',
+    'strings shorter than 20 characters',
+]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Scenario(ABC):
+    """
+    Builds the requests for one iteration against an endpoint: any setup
+    requests, sent untimed, followed by the timed request. Each request is
+    a (method, url, body) tuple.
+    """
+
+    name = None
+
+    def __init__(self, base_url, sample_values):
+        self.base_url = base_url.rstrip('/')
+        self.sample_values = sample_values
+
+    @abstractmethod
+    def build(self, rng):
+        pass
+
+
+class CreateScenario(Scenario):
+    name = 'create'
+
+    def build(self, rng):
+        body = {'value': f'load-{uuid.uuid4().hex} ' + 'word ' * rng.randint(0, 12)}
+        return [('POST', f'{self.base_url}/strings', body)]
+
+
+class ListScenario(Scenario):
+    name = 'list'
+
+    def build(self, rng):
+        params = {}
+        if rng.random() < 0.5:
+            params['is_palindrome'] = rng.choice(['true', 'false'])
+        if rng.random() < 0.5:
+            params['min_length'] = rng.randint(0, 40)
+        if rng.random() < 0.3:
+            params['word_count'] = rng.randint(1, 8)
+        query = f'?{urlencode(params)}' if params else ''
+        return [('GET', f'{self.base_url}/strings{query}', None)]
+
+
+class DetailScenario(Scenario):
+    name = 'detail'
+
+    def build(self, rng):
+        value = rng.choice(self.sample_values)
+        return [('GET', f"{self.base_url}/strings/{quote(value, safe='')}", None)]
+
+
+class NaturalLanguageScenario(Scenario):
+    name = 'natural-language'
+
+    def build(self, rng):
+        query = urlencode({'query': rng.choice(NATURAL_LANGUAGE_QUERIES)})
+        return [('GET', f'{self.base_url}/strings/filter-by-natural-language?{query}', None)]
+
+
+class DeleteScenario(Scenario):
+    name = 'delete'
+
+    def build(self, rng):
+        # Create a throwaway string first so only the delete is timed
+        value = f'load-delete-{uuid.uuid4().hex}'
+        return [
+            ('POST', f'{self.base_url}/strings', {'value': value}),
+            ('DELETE', f"{self.base_url}/strings/{quote(value, safe='')}", None),
+        ]
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (CreateScenario, ListScenario, DetailScenario, NaturalLanguageScenario, DeleteScenario)
+}
+
+
+class Command(BaseCommand):
+    help = 'Run a load test against a running string analyzer server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000')
+        parser.add_argument(
+            '--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS)
+        )
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per scenario')
+        parser.add_argument('--timeout', type=float, default=10.0)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--profile', choices=['cprofile', 'pyinstrument'],
+            help='Ask the server to profile sampled requests (requires PROFILING_ENABLED)'
+        )
+        parser.add_argument(
+            '--profile-every', type=int, default=100,
+            help='Profile every Nth request when --profile is set'
+        )
+        parser.add_argument('--output', help='Write JSON results to this file')
+
+    def handle(self, *args, **options):
+        sample_values = self._sample_values(options)
+        results = {
+            'started_at': timezone.now().isoformat(),
+            'base_url': options['base_url'],
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'python': platform.python_version(),
+            'scenarios': {},
+        }
+
+        for name in options['scenarios']:
+            if name == 'detail' and not sample_values:
+                self.stdout.write(self.style.WARNING('Skipping detail: no strings on the server'))
+                continue
+            scenario = SCENARIOS[name](options['base_url'], sample_values)
+            summary = self._run(scenario, options)
+            results['scenarios'][name] = summary
+            self.stdout.write(
+                f"{name:>16}: {summary['requests_per_second']:.1f} req/s, "
+                f"p50 {summary['latency_ms']['p50']} ms, p99 {summary['latency_ms']['p99']} ms, "
+                f"statuses={summary['statuses']}"
+            )
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def _sample_values(self, options):
+        """Collect existing values for the detail scenario."""
+        url = options['base_url'].rstrip('/') + '/strings?max_length=200'
+        try:
+            with urlopen(url, timeout=options['timeout']) as response:
+                data = json.loads(response.read())
+        except (HTTPError, URLError) as e:
+            raise CommandError(f"Could not reach {options['base_url']}: {e}")
+        return [item['value'] for item in data['data'][:1000]]
+
+    def _request(self, method, url, body, headers, timeout):
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+            headers = {**headers, 'Content-Type': 'application/json'}
+        request = Request(url, data=data, method=method, headers=headers)
+        try:
+            with urlopen(request, timeout=timeout) as response:
+                response.read()
+                return response.status
+        except HTTPError as e:
+            return e.code
+        except OSError:
+            return 'error'
+
+    def _run(self, scenario, options):
+        latencies = []
+        statuses = Counter()
+        lock = threading.Lock()
+        counter = itertools.count(1)
+        stop_at = time.perf_counter() + options['duration']
+
+        def worker(worker_index):
+            rng = random.Random(options['seed'] + worker_index)
+            local_latencies = []
+            local_statuses = Counter()
+            while time.perf_counter() < stop_at:
+                with lock:
+                    request_number = next(counter)
+                headers = {}
+                if options['profile'] and request_number % options['profile_every'] == 0:
+                    headers['X-Profile'] = options['profile']
+
+                *setup, (method, url, body) = scenario.build(rng)
+                for setup_request in setup:
+                    self._request(*setup_request, {}, options['timeout'])
+                started = time.perf_counter()
+                status_code = self._request(method, url, body, headers, options['timeout'])
+                local_latencies.append((time.perf_counter() - started) * 1000)
+                local_statuses[str(status_code)] += 1
+
+            with lock:
+                latencies.extend(local_latencies)
+                statuses.update(local_statuses)
+
+        threads = [
+            threading.Thread(target=worker, args=(n,)) for n in range(options['concurrency'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(latencies) / elapsed, 2),
+            'statuses': dict(sorted(statuses.items())),
+            'latency_ms': {
+                'min': round(latencies[0], 2) if latencies else None,
+                'p50': round(percentile(latencies, 50), 2) if latencies else None,
+                'p90': round(percentile(latencies, 90), 2) if latencies else None,
+                'p99': round(percentile(latencies, 99), 2) if latencies else None,
+                'max': round(latencies[-1], 2) if latencies else None,
+                'mean': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            },
+        }
@@ -0,0 +1,73 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from api.models import AnalyzedString, StringTableVersion
+
+SEED_PREFIX = 'seed-'
+
+WORDS = [
+    'level', 'radar', 'hello', 'world', 'string', 'analyzer', 'python', 'django',
+    'noon', 'civic', 'data', 'quick', 'brown', 'fox', 'jumps', 'over', 'lazy',
+    'dog', 'madam', 'refer', 'kayak', 'stats', 'query', 'index', 'table', 'value',
+]
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic analyzed strings for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000)
+        parser.add_argument(
+            '--palindrome-ratio', type=float, default=0.1,
+            help='Fraction of generated strings that are palindromes'
+        )
+        parser.add_argument(
+            '--median-words', type=float, default=6,
+            help='Median word count; lengths follow a log-normal distribution'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete previously seeded strings before generating new ones'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = AnalyzedString.objects.filter(value__startswith=SEED_PREFIX).delete()
+            self.stdout.write(f'Deleted {deleted} seeded strings')
+
+        rng = random.Random(options['seed'])
+        rows_before = AnalyzedString.objects.count()
+        start = AnalyzedString.objects.filter(value__startswith=SEED_PREFIX).count()
+        batch = []
+
+        for i in range(start, start + options['count']):
+            batch.append(self._generate(rng, i, options))
+            if len(batch) >= options['batch_size']:
+                AnalyzedString.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            AnalyzedString.objects.bulk_create(batch, ignore_conflicts=True)
+
+        # bulk_create doesn't send post_save, so bump the table version here
+        created = AnalyzedString.objects.count() - rows_before
+        StringTableVersion.bump(created)
+
+        self.stdout.write(self.style.SUCCESS(f'Seeded {created} strings'))
+
+    def _generate(self, rng, index, options):
+        word_count = max(1, round(rng.lognormvariate(0, 0.8) * options['median_words']))
+        words = ' '.join(rng.choice(WORDS) for _ in range(word_count))
+
+        if rng.random() < options['palindrome_ratio']:
+            # Mirror the first half so the whole value reads the same backwards
+            half = f'{SEED_PREFIX}{index} {words}'
+            value = half + half[::-1]
+        else:
+            value = f'{SEED_PREFIX}{index} {words}'
+
+        instance = AnalyzedString(value=value)
+        instance.compute_properties()
+        return instance
@@ -0,0 +1,114 @@
+import cProfile
+import os
+import re
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # pyinstrument is optional, cProfile is always available
+    PyinstrumentProfiler = None
+
+re_accepts_brotli = re.compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses with brotli when the client accepts it and the
+    brotli package is installed, falling back to Django's gzip handling.
+    """
+
+    brotli_quality = 5
+
+    def process_response(self, request, response):
+        ae = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if brotli is None or response.streaming or not re_accepts_brotli.search(ae):
+            return super().process_response(request, response)
+
+        # It's not worth attempting to compress really short responses.
+        if len(response.content) < 200 or response.has_header("Content-Encoding"):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        compressed_content = brotli.compress(response.content, quality=self.brotli_quality)
+        if len(compressed_content) >= len(response.content):
+            return response
+
+        response.content = compressed_content
+        response.headers["Content-Length"] = str(len(response.content))
+
+        # The body changed, so a strong ETag no longer holds.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+
+compress_page = decorator_from_middleware(CompressionMiddleware)
+
+
+class ProfilingMiddleware:
+    """
+    Profile individual requests on demand.
+
+    When PROFILING_ENABLED is set, a request carrying an ``X-Profile:
+    cprofile`` or ``X-Profile: pyinstrument`` header is run under that
+    profiler and the result is written to PROFILING_OUTPUT_DIR: a .prof file
+    for cProfile (open with snakeviz or flameprof) or an HTML flame view for
+    pyinstrument. The file name is returned in the X-Profile-Output header.
+    """
+
+    header = 'HTTP_X_PROFILE'
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.output_dir = settings.PROFILING_OUTPUT_DIR
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def __call__(self, request):
+        profiler_name = request.META.get(self.header, '').lower()
+        if profiler_name == 'pyinstrument' and PyinstrumentProfiler is not None:
+            return self._run_pyinstrument(request)
+        if profiler_name in ('cprofile', 'pyinstrument', '1', 'true'):
+            return self._run_cprofile(request)
+        return self.get_response(request)
+
+    def _output_path(self, request, extension):
+        endpoint = request.path.strip('/').replace('/', '_')[:50] or 'root'
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.perf_counter_ns()}-{request.method}-{endpoint}.{extension}"
+        return os.path.join(self.output_dir, filename)
+
+    def _run_cprofile(self, request):
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+        path = self._output_path(request, 'prof')
+        profiler.dump_stats(path)
+        response.headers['X-Profile-Output'] = os.path.basename(path)
+        return response
+
+    def _run_pyinstrument(self, request):
+        profiler = PyinstrumentProfiler()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        path = self._output_path(request, 'html')
+        with open(path, 'w') as f:
+            f.write(profiler.output_html())
+        response.headers['X-Profile-Output'] = os.path.basename(path)
+        return response
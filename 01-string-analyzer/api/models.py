@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
 import hashlib
 import json
@@ -55,3 +56,34 @@ class AnalyzedString(models.Model):
 
     def __str__(self):
         return f"{self.value[:50]}... ({self.sha256_hash[:8]})"
+
+
+class StringTableVersion(models.Model):
+    """
+    Single-row version stamp for the analyzed_strings table, maintained on
+    create and delete so listings can answer conditional GETs without
+    counting or scanning the table.
+    """
+    row_count = models.IntegerField(default=0)
+    last_modified = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'analyzed_strings_version'
+
+    @classmethod
+    def get_current(cls, using='default'):
+        version, created = cls.objects.using(using).get_or_create(pk=1) # Singleton pattern - enforce only one row
+        if created:
+            version.row_count = AnalyzedString.objects.using(using).count()
+            version.save(using=using)
+        return version
+
+    @classmethod
+    def bump(cls, row_delta, using='default'):
+        """Record that row_delta rows were added (or removed, if negative) in the using database."""
+        updated = cls.objects.using(using).filter(pk=1).update(
+            row_count=F('row_count') + row_delta,
+            last_modified=timezone.now(),
+        )
+        if not updated:
+            cls.get_current(using=using)
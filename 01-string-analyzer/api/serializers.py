@@ -1,5 +1,8 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import AnalyzedString
+from .batching import get_insert_batcher
+from .delta import apply_delta
 
 
 class AnalyzedStringSerializer(serializers.ModelSerializer):
@@ -32,9 +35,42 @@ class StringCreateSerializer(serializers.Serializer):
         return value
     
     def create(self, validated_data):
+        if settings.STRING_INSERT_BATCHING:
+            # Group commit: raises IntegrityError for duplicates just like create()
+            return get_insert_batcher().submit(AnalyzedString(**validated_data))
         return AnalyzedString.objects.create(**validated_data)
     
 
+class EditOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['insert', 'delete', 'replace'])
+    position = serializers.IntegerField(min_value=0)
+    length = serializers.IntegerField(min_value=0, required=False, default=0)
+    text = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False, default='')
+
+    def validate(self, attrs):
+        if attrs['op'] == 'insert' and not attrs['text']:
+            raise serializers.ValidationError("insert requires non-empty text")
+        if attrs['op'] in ('delete', 'replace') and not attrs['length']:
+            raise serializers.ValidationError(f"{attrs['op']} requires a positive length")
+        return attrs
+
+
+class StringDeltaSerializer(serializers.Serializer):
+    """ Submit a string as a set of edits against an existing one """
+
+    base_hash = serializers.RegexField(r'^[0-9a-f]{64}$')
+    ops = EditOperationSerializer(many=True, allow_empty=False)
+
+    def create(self, validated_data):
+        # Raises DeltaError if the edits don't fit the base string
+        instance = apply_delta(validated_data['base'], validated_data['ops'])
+
+        if settings.STRING_INSERT_BATCHING:
+            return get_insert_batcher().submit(instance)
+        instance.save(force_insert=True)
+        return instance
+
+
 class StringListSerializer(serializers.Serializer):
     """ Serializer for list response with param filters """
     
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AnalyzedString, StringTableVersion
+
+
+@receiver(post_save, sender=AnalyzedString)
+def bump_version_on_create(sender, instance, created, **kwargs):
+    if created:
+        StringTableVersion.bump(1, using=kwargs['using'])
+
+
+@receiver(post_delete, sender=AnalyzedString)
+def bump_version_on_delete(sender, instance, **kwargs):
+    StringTableVersion.bump(-1, using=kwargs['using'])
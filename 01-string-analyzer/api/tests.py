@@ -1,3 +1,471 @@
-from django.test import TestCase
+import copy
+import gzip
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+
+from .batching import InsertBatcher, PendingInsert
+from .middleware import brotli
+from .delta import DeltaError, apply_delta
+from .models import AnalyzedString, StringTableVersion
+
+PROPERTIES = ['length', 'is_palindrome', 'unique_characters', 'word_count', 'sha256_hash', 'character_frequency_map']
+
+
+def full_properties(value):
+    """Properties of value computed from scratch by the model."""
+    instance = AnalyzedString(value=value)
+    instance.compute_properties()
+    return {name: getattr(instance, name) for name in PROPERTIES}
+
+
+class ApplyDeltaTest(TestCase):
+    def base(self, value):
+        return AnalyzedString.objects.create(value=value)
+
+    def assertMatchesRecomputation(self, base_value, operations):
+        result = apply_delta(self.base(base_value), operations)
+        self.assertEqual({name: getattr(result, name) for name in PROPERTIES}, full_properties(result.value))
+        self.assertEqual(result.id, result.sha256_hash)
+        return result
+
+    def test_insert_at_token_boundaries(self):
+        """Test inserts at the start, end and inside words, and between them"""
+        cases = [
+            ([{'op': 'insert', 'position': 0, 'text': 'big '}], 'big hello world'),
+            ([{'op': 'insert', 'position': 5, 'text': 'ish'}], 'helloish world'),
+            ([{'op': 'insert', 'position': 6, 'text': 'new'}], 'hello newworld'),
+            ([{'op': 'insert', 'position': 3, 'text': ' '}], 'hel lo world'),
+            ([{'op': 'insert', 'position': 11, 'text': ' again'}], 'hello world again'),
+        ]
+        for operations, expected in cases:
+            with self.subTest(expected=expected):
+                AnalyzedString.objects.all().delete()
+                result = self.assertMatchesRecomputation('hello world', operations)
+                self.assertEqual(result.value, expected)
+
+    def test_delete_and_replace_across_tokens(self):
+        """Test edits that merge, split and span words"""
+        cases = [
+            ([{'op': 'delete', 'position': 5, 'length': 1}], 'helloworld'),
+            ([{'op': 'delete', 'position': 3, 'length': 5}], 'helrld'),
+            ([{'op': 'replace', 'position': 4, 'length': 3, 'text': ' - '}], 'hell - orld'),
+            ([{'op': 'replace', 'position': 0, 'length': 11, 'text': 'x'}], 'x'),
+        ]
+        for operations, expected in cases:
+            with self.subTest(expected=expected):
+                AnalyzedString.objects.all().delete()
+                result = self.assertMatchesRecomputation('hello world', operations)
+                self.assertEqual(result.value, expected)
+
+    def test_whitespace_only_edits(self):
+        """Test that adding, removing or changing whitespace keeps counts exact"""
+        cases = [
+            [{'op': 'insert', 'position': 5, 'text': '   '}],
+            [{'op': 'replace', 'position': 5, 'length': 1, 'text': '\t\n'}],
+            [{'op': 'insert', 'position': 0, 'text': ' '}],
+            [{'op': 'insert', 'position': 11, 'text': '\n'}],
+            [{'op': 'delete', 'position': 0, 'length': 2}],
+        ]
+        for operations in cases:
+            with self.subTest(operations=operations):
+                AnalyzedString.objects.all().delete()
+                self.assertMatchesRecomputation('  hello world', operations)
+
+    def test_multiple_operations_apply_in_order(self):
+        """Test that each operation applies to the result of the previous one"""
+        result = self.assertMatchesRecomputation('abc def', [
+            {'op': 'replace', 'position': 0, 'length': 3, 'text': 'racecar'},
+            {'op': 'delete', 'position': 7, 'length': 4},
+            {'op': 'insert', 'position': 7, 'text': ' kayak'},
+            {'op': 'delete', 'position': 7, 'length': 6},
+        ])
+        self.assertEqual(result.value, 'racecar')
+        self.assertTrue(result.is_palindrome)
+
+    def test_random_edits_match_recomputation(self):
+        """Test random edit sequences against full recomputation"""
+        rng = random.Random(26)
+        alphabet = 'ab c\t\n'
+        for _ in range(200):
+            value = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 12)))
+            operations = []
+            current = value
+            for _ in range(rng.randint(1, 4)):
+                position = rng.randint(0, len(current))
+                op = rng.choice(['insert', 'delete', 'replace'])
+                length = rng.randint(1, len(current) - position) if op != 'insert' and position < len(current) else 0
+                if op != 'insert' and not length:
+                    op = 'insert'
+                text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 3))) if op != 'delete' else ''
+                operations.append({'op': op, 'position': position, 'length': length, 'text': text})
+                current = current[:position] + text + current[position + length:]
+            if not current:
+                continue
+
+            base = AnalyzedString(value=value)
+            base.compute_properties()
+            result = apply_delta(base, operations)
+            self.assertEqual(result.value, current)
+            self.assertEqual({name: getattr(result, name) for name in PROPERTIES}, full_properties(current))
+
+    def test_empty_result_is_rejected(self):
+        """Test that deleting the whole string raises DeltaError"""
+        with self.assertRaises(DeltaError):
+            apply_delta(self.base('hello'), [{'op': 'delete', 'position': 0, 'length': 5}])
+
+    def test_out_of_range_operation_is_rejected(self):
+        """Test that positions and lengths past the end raise DeltaError"""
+        base = self.base('hello')
+        for operation in [
+            {'op': 'insert', 'position': 6, 'text': 'x'},
+            {'op': 'delete', 'position': 3, 'length': 3},
+            {'op': 'replace', 'position': 5, 'length': 1, 'text': 'x'},
+        ]:
+            with self.subTest(operation=operation):
+                with self.assertRaises(DeltaError):
+                    apply_delta(base, [operation])
+
+
+class StringDeltaViewTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('string-list-create')
+        self.base = AnalyzedString.objects.create(value='hello world')
+
+    def post_delta(self, ops, base_hash=None):
+        return self.client.post(
+            self.url, {'base_hash': base_hash or self.base.sha256_hash, 'ops': ops}, format='json'
+        )
+
+    def test_delta_creates_string(self):
+        """Test that a delta creates the edited string with recomputed properties"""
+        response = self.post_delta([{'op': 'replace', 'position': 6, 'length': 5, 'text': 'there'}])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['value'], 'hello there')
+        self.assertEqual(response.data['properties'], full_properties('hello there'))
+        self.assertTrue(AnalyzedString.objects.filter(value='hello there').exists())
+
+    def test_delta_to_existing_string_conflicts(self):
+        """Test that a delta producing a stored string returns 409"""
+        AnalyzedString.objects.create(value='hello')
+
+        response = self.post_delta([{'op': 'delete', 'position': 5, 'length': 6}])
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_unknown_base_hash(self):
+        """Test 404 when the base string doesn't exist"""
+        response = self.post_delta(
+            [{'op': 'insert', 'position': 0, 'text': 'x'}],
+            base_hash=hashlib.sha256(b'missing').hexdigest(),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_out_of_range_and_empty_results_are_unprocessable(self):
+        """Test 422 for edits that don't fit the base string or empty it"""
+        for ops in [
+            [{'op': 'insert', 'position': 12, 'text': 'x'}],
+            [{'op': 'delete', 'position': 0, 'length': 11}],
+        ]:
+            with self.subTest(ops=ops):
+                response = self.post_delta(ops)
+                self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+                self.assertIn('error', response.data)
+
+    def test_invalid_operations_are_unprocessable(self):
+        """Test 422 for malformed operations and base hashes"""
+        cases = [
+            ([{'op': 'insert', 'position': 0}], None),
+            ([{'op': 'delete', 'position': 0}], None),
+            ([{'op': 'replace', 'position': 0, 'length': 0, 'text': 'x'}], None),
+            ([{'op': 'append', 'position': 0, 'text': 'x'}], None),
+            ([{'op': 'insert', 'position': -1, 'text': 'x'}], None),
+            ([], None),
+            ([{'op': 'insert', 'position': 0, 'text': 'x'}], 'not-a-hash'),
+        ]
+        for ops, base_hash in cases:
+            with self.subTest(ops=ops, base_hash=base_hash):
+                response = self.post_delta(ops, base_hash=base_hash)
+                self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(AnalyzedString.objects.count(), 1)
+
+
+class InsertBatcherTest(TestCase):
+    def pending(self, *values):
+        return [PendingInsert(AnalyzedString(value=value)) for value in values]
+
+    def write(self, batch):
+        for pending in batch:
+            pending.instance.compute_properties()
+        InsertBatcher()._write_batch(batch)
+
+    def test_batch_is_written_and_bumps_version(self):
+        """Test that a batch is inserted together and counted in the version row"""
+        StringTableVersion.get_current()
+        batch = self.pending('alpha', 'beta', 'gamma')
+
+        self.write(batch)
+
+        self.assertTrue(all(pending.created for pending in batch))
+        self.assertEqual(AnalyzedString.objects.count(), 3)
+        self.assertEqual(StringTableVersion.get_current().row_count, 3)
+
+    def test_duplicate_in_same_batch(self):
+        """Test that the first of two identical submissions wins"""
+        batch = self.pending('alpha', 'beta', 'alpha')
+
+        self.write(batch)
+
+        self.assertEqual([pending.created for pending in batch], [True, True, False])
+        self.assertEqual(AnalyzedString.objects.count(), 2)
+
+    def test_existing_string_is_not_created(self):
+        """Test that a string already stored is reported as not created"""
+        AnalyzedString.objects.create(value='alpha')
+        batch = self.pending('alpha', 'beta')
+
+        self.write(batch)
+
+        self.assertEqual([pending.created for pending in batch], [False, True])
+
+    def test_row_inserted_outside_batcher_falls_back_to_single_inserts(self):
+        """Test that a conflict missed by the existence check is settled row by row"""
+        StringTableVersion.get_current()
+        AnalyzedString.objects.create(value='alpha')
+        batch = self.pending('alpha', 'beta')
+
+        # As if 'alpha' was inserted between the existence check and bulk_create
+        with patch.object(InsertBatcher, '_existing_ids', return_value=set()), \
+                patch.object(InsertBatcher, '_write_individually', autospec=True,
+                             side_effect=InsertBatcher._write_individually) as write_individually:
+            self.write(batch)
+
+        write_individually.assert_called_once()
+        self.assertEqual([pending.created for pending in batch], [False, True])
+        self.assertEqual(AnalyzedString.objects.count(), 2)
+        self.assertEqual(StringTableVersion.get_current().row_count, 2)
+
+
+@override_settings(STRING_INSERT_BATCHING=True)
+class BatchedCreateViewTest(APITransactionTestCase):
+    def setUp(self):
+        self.url = reverse('string-list-create')
+
+    def test_concurrent_posts_get_their_own_results(self):
+        """Test that requests sharing one batch each get 201, or 409 for a duplicate"""
+        values = ['alpha', 'beta', 'gamma', 'alpha']
+        batcher = InsertBatcher(window_ms=1000, max_batch_size=len(values))
+        barrier = threading.Barrier(len(values))
+        results = {}
+
+        def post(index, value):
+            barrier.wait()
+            response = APIClient().post(self.url, {'value': value}, format='json')
+            results[index] = response.status_code
+
+        with patch('api.serializers.get_insert_batcher', return_value=batcher), \
+                patch.object(InsertBatcher, '_write_batch', autospec=True,
+                             side_effect=InsertBatcher._write_batch) as write_batch:
+            threads = [threading.Thread(target=post, args=item) for item in enumerate(values)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        write_batch.assert_called_once()
+        self.assertEqual(sorted(results.values()), [201, 201, 201, 409])
+        self.assertEqual(AnalyzedString.objects.count(), 3)
+        self.assertEqual(StringTableVersion.get_current().row_count, 3)
+
+    def test_submit_raises_integrity_error_for_existing_string(self):
+        """Test that submit() matches objects.create() for a stored string"""
+        AnalyzedString.objects.create(value='alpha')
+        batcher = InsertBatcher(window_ms=1)
+
+        with self.assertRaises(IntegrityError):
+            batcher.submit(AnalyzedString(value='alpha'))
+        self.assertEqual(batcher.submit(AnalyzedString(value='beta')).value, 'beta')
+
+
+class ListingCompressionTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('string-list-create')
+        for i in range(10):
+            AnalyzedString.objects.create(value=f'string number {i}')
+
+    def test_gzip_when_accepted(self):
+        """Test that listings are gzipped for clients that accept it"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content))['count'], 10)
+
+    def test_uncompressed_without_accept_encoding(self):
+        """Test that clients without Accept-Encoding get plain JSON"""
+        response = self.client.get(self.url)
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json()['count'], 10)
+
+    @unittest.skipUnless(brotli, 'brotli is not installed')
+    def test_brotli_preferred_when_accepted(self):
+        """Test that br is used over gzip when both are accepted"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(json.loads(brotli.decompress(response.content))['count'], 10)
+
+    def test_gzip_fallback_without_brotli(self):
+        """Test that br clients get gzip when the brotli package is missing"""
+        with patch('api.middleware.brotli', None):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br, gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_detail_is_compressed(self):
+        """Test that the detail endpoint is compressed too"""
+        AnalyzedString.objects.create(value='x' * 300)
+
+        response = self.client.get(reverse('string-detail', args=['x' * 300]), HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class ProfilingMiddlewareTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('string-list-create')
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        self.output_dir = output_dir.name
+
+    def test_profiles_request_when_enabled(self):
+        """Test that a request asking for a profile gets one written when profiling is enabled"""
+        with self.settings(PROFILING_ENABLED=True, PROFILING_OUTPUT_DIR=self.output_dir):
+            response = self.client.get(self.url, HTTP_X_PROFILE='cprofile')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['X-Profile-Output'].endswith('.prof'))
+        self.assertEqual(os.listdir(self.output_dir), [response['X-Profile-Output']])
+
+    def test_untouched_when_disabled(self):
+        """Test that the profile header is ignored when profiling is disabled"""
+        with self.settings(PROFILING_ENABLED=False, PROFILING_OUTPUT_DIR=self.output_dir):
+            response = self.client.get(self.url, HTTP_X_PROFILE='cprofile')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('X-Profile-Output'))
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+
+class StringTableVersionTest(TestCase):
+    other_alias = 'version_test'
+
+    @classmethod
+    def setUpClass(cls):
+        # A second database, registered the way benchmark_sqlite does it
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        config = copy.deepcopy(connections.settings['default'])
+        config['NAME'] = os.path.join(cls.tmpdir.name, 'other.sqlite3')
+        connections.settings[cls.other_alias] = config
+        call_command('migrate', database=cls.other_alias, verbosity=0)
+        # Set here rather than on the class, since the alias only exists from now on
+        cls.databases = {'default', cls.other_alias}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[cls.other_alias].close()
+        del connections[cls.other_alias]
+        del connections.settings[cls.other_alias]
+        cls.tmpdir.cleanup()
+
+    def test_writes_bump_the_version_of_their_own_database(self):
+        """Test that saves and deletes on another alias leave the default version alone"""
+        AnalyzedString.objects.create(value='alpha')
+        StringTableVersion.get_current()
+        StringTableVersion.get_current(using=self.other_alias)
+
+        other = AnalyzedString(value='beta')
+        other.save(using=self.other_alias)
+        AnalyzedString(value='gamma').save(using=self.other_alias)
+        other.delete(using=self.other_alias)
+
+        self.assertEqual(StringTableVersion.get_current().row_count, 1)
+        self.assertEqual(StringTableVersion.get_current(using=self.other_alias).row_count, 1)
+        self.assertEqual(AnalyzedString.objects.using(self.other_alias).count(), 1)
+
+class ListingConditionalGetTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('string-list-create')
+        AnalyzedString.objects.create(value='alpha')
+        StringTableVersion.get_current()
+
+    def test_validators_are_sent(self):
+        """Test that listings carry ETag and Last-Modified"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_unchanged_listing_is_not_modified(self):
+        """Test 304 for matching validators, answered from the version row alone"""
+        first = self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            by_etag = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        by_date = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+        self.assertEqual(by_etag.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(by_date.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_depends_on_query(self):
+        """Test that differently filtered listings have different ETags"""
+        first = self.client.get(self.url)
+
+        response = self.client.get(self.url + '?min_length=3', HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_create_and_delete_change_the_etag(self):
+        """Test that a create or delete makes the previous ETag stale"""
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(self.url, {'value': 'beta'}, format='json')
+
+        after_create = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(after_create.status_code, status.HTTP_200_OK)
+        self.assertEqual(after_create.json()['count'], 2)
+
+        etag = after_create['ETag']
+        self.client.delete(reverse('string-detail', args=['beta']))
+
+        after_delete = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(after_delete.status_code, status.HTTP_200_OK)
+        self.assertEqual(after_delete.json()['count'], 1)
+        self.assertEqual(StringTableVersion.get_current().row_count, 1)
+
+    def test_natural_language_listing_is_conditional(self):
+        """Test that the natural language filter answers conditional GETs"""
+        url = reverse('natural-language-filter') + '?query=single word'
+        first = self.client.get(url)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
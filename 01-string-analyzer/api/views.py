@@ -4,24 +4,59 @@ from rest_framework.response import Response
 from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+import hashlib
 import re
 
-from .models import AnalyzedString
+from .models import AnalyzedString, StringTableVersion
+from .delta import DeltaError
+from .middleware import compress_page
 from .serializers import (
     AnalyzedStringSerializer,
     StringCreateSerializer,
+    StringDeltaSerializer,
     StringListSerializer,
     NaturalLanguageFilterSerializer
 )
 
 
+def _table_version(request):
+    """Fetch the table version once per request."""
+    if not hasattr(request, '_string_table_version'):
+        request._string_table_version = StringTableVersion.get_current()
+    return request._string_table_version
+
+
+def listing_etag(request, *args, **kwargs):
+    """ETag for a listing: table version plus the query that shaped it."""
+    version = _table_version(request)
+    key = f"{version.row_count}:{version.last_modified.isoformat()}:{request.get_full_path()}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def listing_last_modified(request, *args, **kwargs):
+    return _table_version(request).last_modified
+
+
+listing_condition = method_decorator(
+    condition(etag_func=listing_etag, last_modified_func=listing_last_modified),
+    name='get'
+)
+
+
+@method_decorator(compress_page, name='dispatch')
+@listing_condition
 class StringAnalyzerView(APIView):
     """
-    POST /strings - Create and analyze a new string
+    POST /strings - Create and analyze a new string (or a delta against an existing one)
     GET /strings - List all strings with optional filters
     """
 
     def post(self, request):
+        if 'base_hash' in request.data:
+            return self._post_delta(request)
+
         serializer = StringCreateSerializer(data=request.data)
 
         if not serializer.is_valid():
@@ -42,6 +77,31 @@ class StringAnalyzerView(APIView):
                 status=status.HTTP_409_CONFLICT
             )
 
+    def _post_delta(self, request):
+        """Create a string from edit operations applied to an existing string."""
+        serializer = StringDeltaSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        try:
+            base = AnalyzedString.objects.get(sha256_hash=serializer.validated_data['base_hash'])
+        except AnalyzedString.DoesNotExist:
+            return Response(
+                {'error': 'Base string does not exist in the system'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            analyzed_string = serializer.save(base=base)
+            response_serializer = AnalyzedStringSerializer(analyzed_string)
+            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+        except DeltaError as e:
+            return Response({'error': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        except IntegrityError:
+            return Response(
+                {'error': 'String already exists in the system'},
+                status=status.HTTP_409_CONFLICT
+            )
 
     def get(self, request):
         queryset = AnalyzedString.objects.all()
@@ -139,6 +199,7 @@ class StringAnalyzerView(APIView):
         return None
     
 
+@method_decorator(compress_page, name='dispatch')
 class StringDetailView(APIView):
     """
     GET /strings/{string_value} - Get a specific string
@@ -168,6 +229,8 @@ class StringDetailView(APIView):
             )
         
 
+@method_decorator(compress_page, name='dispatch')
+@listing_condition
 class NaturalLanguageFilterView(APIView):
     """
     GET /strings/filter-by-natural-language - Filter strings using natural language
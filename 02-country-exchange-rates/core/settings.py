@@ -162,6 +162,24 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 CACHE_DIR = os.path.join(BASE_DIR, 'cache')
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# Where the summary image is written: cache, static (STATIC_ROOT) or media (MEDIA_ROOT)
+SUMMARY_IMAGE_LOCATION = os.getenv('SUMMARY_IMAGE_LOCATION', 'cache')
+# Seconds clients may reuse /countries/image before revalidating it
+SUMMARY_IMAGE_MAX_AGE = int(os.getenv('SUMMARY_IMAGE_MAX_AGE', '60'))
+
+# Serve GET /countries from an in-process copy of the countries table
+COUNTRY_SNAPSHOT_ENABLED = os.getenv('COUNTRY_SNAPSHOT_ENABLED', 'True') == 'True'
+# How often (seconds) to check whether another process changed the data
+COUNTRY_SNAPSHOT_CHECK_INTERVAL = float(os.getenv('COUNTRY_SNAPSHOT_CHECK_INTERVAL', '1.0'))
+# Distinct list queries whose rendered JSON is kept per snapshot
+COUNTRY_LIST_CACHE_SIZE = int(os.getenv('COUNTRY_LIST_CACHE_SIZE', '256'))
+# Most requested list queries to render right after a refresh (0 disables)
+COUNTRY_LIST_WARM_UP = int(os.getenv('COUNTRY_LIST_WARM_UP', '10'))
+# Page size of GET /countries when a cursor is given without a limit
+COUNTRY_PAGE_SIZE = int(os.getenv('COUNTRY_PAGE_SIZE', '100'))
+# Seconds each process reuses its copy of GET /status before re-reading it
+STATUS_CACHE_TTL = float(os.getenv('STATUS_CACHE_TTL', '1.0'))
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOW_ALL_ORIGINS = True
@@ -1,7 +1,42 @@
 import django_filters
+from django.db import connections
+from django.db.models import F
 from .models import Country
 
 
+# Sort options as (field, descending) pairs. NULLs always sort last, and
+# name is unique, so every option is a total, stable ordering.
+SORT_OPTIONS = {
+    "name_asc": [("name", False)],
+    "name_desc": [("name", True)],
+    "population_asc": [("population", False), ("name", False)],
+    "population_desc": [("population", True), ("name", False)],
+    "gdp_asc": [("estimated_gdp", False), ("name", False)],
+    "gdp_desc": [("estimated_gdp", True), ("name", False)],
+}
+DEFAULT_SORT = "name_asc"
+
+
+def sort_ordering(value, using="default"):
+    """
+    order_by() expressions for a sort option (unknown values fall back to
+    the default). Only nullable columns get a NULLS LAST modifier, and only
+    where the backend wouldn't put NULLs last anyway, so MySQL and SQLite
+    can still walk the (estimated_gdp, name) indexes for descending sorts.
+    MySQL emulates NULLS LAST with an "IS NULL" sort key, so its ascending
+    GDP sort can't use the index and sorts the rows instead.
+    """
+    nulls_largest = connections[using].features.nulls_order_largest
+    ordering = []
+    for field, descending in SORT_OPTIONS.get(value, SORT_OPTIONS[DEFAULT_SORT]):
+        nullable = Country._meta.get_field(field).null
+        if descending:
+            ordering.append(F(field).desc(nulls_last=True if nullable and nulls_largest else None))
+        else:
+            ordering.append(F(field).asc(nulls_last=True if nullable and not nulls_largest else None))
+    return ordering
+
+
 class CountryFilter(django_filters.FilterSet):
     region = django_filters.CharFilter(field_name="region", lookup_expr="iexact")
     currency = django_filters.CharFilter(
@@ -17,20 +52,4 @@ class CountryFilter(django_filters.FilterSet):
 
     def filter_sort(self, queryset, name, value):
         """Handle custom sorting"""
-        if value == 'gdp_desc':
-            return queryset.order_by('-estimated_gdp', 'name')
-        elif value == 'gdp_asc':
-            non_null = queryset.filter(estimated_gdp__isnull=False).order_by('estimated_gdp', 'name')
-            nulls = queryset.filter(estimated_gdp__isnull=True).order_by('name')
-            return non_null.union(nulls)
-        elif value == "population_desc":
-            return queryset.order_by("-population")
-        elif value == "population_asc":
-            return queryset.order_by("population")
-        elif value == "name_asc":
-            return queryset.order_by("name")
-        elif value == "name_desc":
-            return queryset.order_by("-name")
-
-        # Default sorting
-        return queryset.order_by("name")
+        return queryset.order_by(*sort_ordering(value, using=queryset.db))
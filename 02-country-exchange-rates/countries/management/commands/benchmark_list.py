@@ -0,0 +1,106 @@
+import itertools
+import json
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+from countries.models import Country, SystemStatus
+from countries.views import CountryViewSet
+
+BENCH_PREFIX = 'Benchmark Country'
+
+QUERIES = [
+    '',
+    '?region=Africa',
+    '?currency=EUR',
+    '?sort=gdp_desc',
+    '?region=Europe&sort=population_desc',
+    '?sort=name_desc',
+]
+
+
+def seed_countries(count, rng):
+    """Create synthetic benchmark countries"""
+    regions = ['Africa', 'Americas', 'Asia', 'Europe', 'Oceania']
+    currencies = [f'C{i:02d}' for i in range(150)] + ['EUR']
+    countries = []
+    for i in range(count):
+        name = f'{BENCH_PREFIX} {i:04d}'
+        country = Country(
+            name=name,
+            name_key=Country.normalize_name(name),
+            capital=f'Capital {i}',
+            region=rng.choice(regions),
+            population=rng.randint(10_000, 300_000_000),
+            currency_code=rng.choice(currencies),
+            exchange_rate=Decimal(str(round(rng.uniform(0.1, 5000), 4))),
+            flag_url=f'https://flagcdn.com/w320/{i:04d}.png',
+        )
+        country.estimated_gdp = country.calculate_estimated_gdp(rng=rng)
+        countries.append(country)
+    Country.objects.bulk_create(countries)
+    SystemStatus.get_current_status().bump_data_version()
+
+
+class Command(BaseCommand):
+    help = 'Compare GET /countries throughput of the in-memory snapshot and the database path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per path')
+        parser.add_argument(
+            '--countries', type=int, default=250,
+            help='Synthetic countries to create when the table is empty'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        created = False
+        if not Country.objects.exists():
+            seed_countries(options['countries'], random.Random(options['seed']))
+            created = True
+        total_countries = Country.objects.count()
+
+        view = CountryViewSet.as_view({'get': 'list'})
+        factory = RequestFactory()
+        results = {}
+        try:
+            for name, enabled in (('database', False), ('snapshot', True)):
+                with override_settings(COUNTRY_SNAPSHOT_ENABLED=enabled):
+                    # Warm up (loads the snapshot once)
+                    view(factory.get('/countries')).render()
+                    results[name] = self._run(view, factory, options['requests'])
+                self.stdout.write(
+                    f"{name:>9}: {results[name]['requests_per_second']:.1f} req/s, "
+                    f"mean {results[name]['mean_ms']} ms"
+                )
+        finally:
+            if created:
+                Country.objects.filter(name__startswith=BENCH_PREFIX).delete()
+                SystemStatus.get_current_status().bump_data_version()
+
+        results['speedup'] = round(
+            results['snapshot']['requests_per_second'] / results['database']['requests_per_second'], 1
+        )
+        self.stdout.write(json.dumps({
+            'database': connection.vendor,
+            'countries': total_countries,
+            'results': results,
+        }, indent=2))
+
+    def _run(self, view, factory, total):
+        queries = itertools.cycle(QUERIES)
+        started = time.perf_counter()
+        for _ in range(total):
+            response = view(factory.get('/countries' + next(queries)))
+            response.render()
+        elapsed = time.perf_counter() - started
+        return {
+            'requests': total,
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(total / elapsed, 1),
+            'mean_ms': round(elapsed / total * 1000, 3),
+        }
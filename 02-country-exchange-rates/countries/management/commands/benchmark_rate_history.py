@@ -0,0 +1,84 @@
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from countries.models import ExchangeRateHistory
+from countries.utils.rate_history import RateHistoryStore
+
+BENCH_PREFIX = 'BENCH'
+
+RANGES = [
+    ('1 day', timedelta(days=1)),
+    ('30 days', timedelta(days=30)),
+    ('1 year', timedelta(days=365)),
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure storage size and range read time of the exchange rate history with synthetic hourly rates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=3)
+        parser.add_argument('--currencies', type=int, default=5)
+        parser.add_argument('--reads', type=int, default=50, help='Reads per range')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        end = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        start = end - timedelta(days=365 * options['years'])
+        first, hours = int(start.timestamp()), options['years'] * 365 * 24
+        codes = [f'{BENCH_PREFIX}{i:02d}' for i in range(options['currencies'])]
+
+        series = {}
+        for code in codes:
+            rate = rng.uniform(0.5, 2000)
+            samples = []
+            for hour in range(hours):
+                # Random walk rounded to the 6 decimal places rates are stored with
+                rate = round(rate * (1 + rng.gauss(0, 0.001)), 6)
+                samples.append((first + hour * 3600, rate))
+            series[code] = samples
+
+        try:
+            started = time.perf_counter()
+            RateHistoryStore.record(series)
+            write_seconds = time.perf_counter() - started
+
+            blobs = ExchangeRateHistory.objects.filter(currency_code__in=codes).values_list('samples', flat=True)
+            row_count = len(blobs)
+            stored_bytes = sum(len(blob) for blob in blobs)
+            samples_total = hours * len(codes)
+
+            reads = {}
+            for label, span in RANGES + [('all', end - start)]:
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for i in range(options['reads']):
+                        code = codes[i % len(codes)]
+                        result = RateHistoryStore.read(code, end - span, end)
+                    elapsed = time.perf_counter() - started
+                reads[label] = {
+                    'samples': len(result),
+                    'mean_ms': round(elapsed / options['reads'] * 1000, 3),
+                    'queries_per_read': len(queries) // options['reads'],
+                }
+                self.stdout.write(f"{label:>8}: {reads[label]['samples']} rates in {reads[label]['mean_ms']} ms")
+        finally:
+            ExchangeRateHistory.objects.filter(currency_code__startswith=BENCH_PREFIX).delete()
+
+        self.stdout.write(json.dumps({
+            'database': connection.vendor,
+            'currencies': len(codes),
+            'samples': samples_total,
+            'rows': row_count,
+            'write_seconds': round(write_seconds, 3),
+            'stored_bytes': stored_bytes,
+            'bytes_per_sample': round(stored_bytes / samples_total, 2),
+            'reads': reads,
+        }, indent=2))
@@ -0,0 +1,72 @@
+import json
+import random
+import time
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from countries.utils.external_apis import CountryDataFetcher, DataRefreshService, ExchangeRateFetcher
+from countries.utils.upstream_cache import FetchResult
+
+BENCH_PREFIX = 'Benchmark Country'
+
+
+class Command(BaseCommand):
+    help = 'Measure refresh_country_data wall time and query count with synthetic upstream data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--countries', type=int, default=250)
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        currencies = [f'C{i:02d}' for i in range(150)]
+        rates = {code: round(rng.uniform(0.1, 5000), 4) for code in currencies}
+        payload = [
+            {
+                'name': f'{BENCH_PREFIX} {i:04d}',
+                'capital': f'Capital {i}',
+                'region': rng.choice(['Africa', 'Americas', 'Asia', 'Europe', 'Oceania']),
+                'population': rng.randint(10_000, 300_000_000),
+                'flag': f'https://flagcdn.com/{i}.svg',
+                'currencies': [{'code': rng.choice(currencies)}],
+            }
+            for i in range(options['countries'])
+        ]
+
+        runs = []
+        # Everything the refresh writes (countries, rollups, rate history,
+        # status) is rolled back at the end, leaving the database untouched
+        with transaction.atomic():
+            for run in range(options['runs']):
+                # New rates every run, so each one rewrites every country
+                # instead of finding them unchanged after the first
+                run_rates = {code: round(rate * (1 + run / 100), 4) for code, rate in rates.items()}
+                with patch.object(CountryDataFetcher, 'fetch_all_countries_if_changed',
+                                  return_value=FetchResult(payload, changed=True)), \
+                        patch.object(ExchangeRateFetcher, 'fetch_exchange_rate_if_changed',
+                                     return_value=FetchResult(run_rates, changed=True)):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        result = DataRefreshService.refresh_country_data(force=True)
+                        elapsed = time.perf_counter() - started
+                runs.append({
+                    'run': run + 1,
+                    'seconds': round(elapsed, 4),
+                    'queries': len(queries),
+                    'result': result,
+                })
+                self.stdout.write(
+                    f"run {run + 1}: {elapsed * 1000:.1f} ms, {len(queries)} queries "
+                    f"(created {result['created']}, updated {result['updated']})"
+                )
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps({
+            'database': connection.vendor,
+            'countries': options['countries'],
+            'runs': runs,
+        }, indent=2))
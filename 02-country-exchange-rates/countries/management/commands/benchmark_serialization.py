@@ -0,0 +1,70 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+
+from countries.models import Country, SystemStatus
+from countries.serializers import CountryListSerializer, CountrySerializer
+from countries.management.commands.benchmark_list import BENCH_PREFIX, seed_countries
+
+# What the map widget asks for
+MAP_FIELDS = ('name', 'region', 'estimated_gdp')
+
+
+class Command(BaseCommand):
+    help = 'Compare payload size and serialization time of the country list serializers and fields= projections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument(
+            '--countries', type=int, default=250,
+            help='Synthetic countries to create when the table is empty'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        created = False
+        if not Country.objects.exists():
+            seed_countries(options['countries'], random.Random(options['seed']))
+            created = True
+        total_countries = Country.objects.count()
+
+        countries = Country.objects.order_by('name')
+        # Each case queries, serializes and renders the whole list; .all()
+        # keeps the queryset from being cached between runs
+        cases = [
+            ('model serializer', lambda: CountrySerializer(countries.all(), many=True).data),
+            ('list serializer', lambda: CountryListSerializer().serialize(
+                countries.values(*CountryListSerializer.FIELDS))),
+            ('list serializer, fields=' + ','.join(MAP_FIELDS), lambda: CountryListSerializer(MAP_FIELDS).serialize(
+                countries.values(*MAP_FIELDS))),
+        ]
+
+        results = {}
+        try:
+            for name, serialize in cases:
+                serialize()
+                started = time.perf_counter()
+                for _ in range(options['runs']):
+                    payload = JSONRenderer().render(serialize())
+                elapsed = time.perf_counter() - started
+                results[name] = {
+                    'payload_bytes': len(payload),
+                    'mean_ms': round(elapsed / options['runs'] * 1000, 3),
+                }
+                self.stdout.write(
+                    f"{name:>45}: {results[name]['payload_bytes']} bytes, {results[name]['mean_ms']} ms"
+                )
+        finally:
+            if created:
+                Country.objects.filter(name__startswith=BENCH_PREFIX).delete()
+                SystemStatus.get_current_status().bump_data_version()
+
+        self.stdout.write(json.dumps({
+            'database': connection.vendor,
+            'countries': total_countries,
+            'results': results,
+        }, indent=2))
@@ -4,13 +4,23 @@ from countries.utils.image_generator import SummaryImageGenerator
 
 class Command(BaseCommand):
     help = 'Refresh country data from external APIs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Refetch and rewrite even if the upstream data has not changed'
+        )
     
     def handle(self, *args, **options):
         try:
             self.stdout.write('Starting country data refresh...')
             
-            result = DataRefreshService.refresh_country_data()
+            result = DataRefreshService.refresh_country_data(force=options['force'])
             
+            if result['up_to_date']:
+                self.stdout.write(self.style.SUCCESS('Country data is already up to date.'))
+                return
+
             # Generate summary image
             image_generator = SummaryImageGenerator()
             image_generator.generate_image()
@@ -18,7 +28,8 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.SUCCESS(
                     f"Successfully refreshed {result['total_processed']} countries. "
-                    f"Created: {result['created']}, Updated: {result['updated']}"
+                    f"Created: {result['created']}, Updated: {result['updated']}, "
+                    f"Unchanged: {result['unchanged']}, Rows written: {result['rows_written']}"
                 )
             )
             
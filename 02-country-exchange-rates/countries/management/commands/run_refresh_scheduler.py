@@ -0,0 +1,119 @@
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from countries.models import RefreshJob
+from countries.utils.external_apis import DataRefreshService
+from countries.utils.image_generator import SummaryImageGenerator
+from countries.utils.refresh_jobs import RefreshJobRunner
+
+
+class Command(BaseCommand):
+    help = (
+        'Keep country data fresh: apply exchange rates on a short cadence and '
+        'refresh country metadata on a longer one'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rates-interval', type=int, default=3600,
+            help='Seconds between rates-only refreshes (default: hourly)'
+        )
+        parser.add_argument(
+            '--metadata-interval', type=int, default=86400,
+            help='Seconds between full country refreshes (default: daily)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Run a full refresh once and exit'
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stopping.set())
+
+        if options['once']:
+            self.refresh_metadata()
+            return
+
+        self.stdout.write(
+            f"Scheduler started: rates every {options['rates_interval']}s, "
+            f"metadata every {options['metadata_interval']}s"
+        )
+        # A full refresh also applies the latest rates
+        next_metadata = time.monotonic()
+        next_rates = next_metadata + options['rates_interval']
+
+        try:
+            while not self.stopping.is_set():
+                now = time.monotonic()
+                if now >= next_metadata:
+                    self.refresh_metadata()
+                    next_metadata = now + options['metadata_interval']
+                    next_rates = now + options['rates_interval']
+                elif now >= next_rates:
+                    self.refresh_rates()
+                    next_rates = now + options['rates_interval']
+
+                self.stopping.wait(max(0, min(next_metadata, next_rates) - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write('Scheduler stopped.')
+
+    def refresh_metadata(self):
+        """Full refresh, run through the job table so it never overlaps an API-triggered one."""
+        job, created = RefreshJobRunner.submit(background=False)
+        if not created:
+            self.stdout.write(f"Refresh job {job.pk} already in progress, skipping metadata refresh.")
+            return
+
+        RefreshJobRunner.run(job.pk)
+        job.refresh_from_db()
+        if job.status == RefreshJob.STATUS_FAILED:
+            self.stdout.write(self.style.ERROR(f"Metadata refresh failed: {job.error}"))
+        elif job.result['up_to_date']:
+            self.stdout.write('Metadata refresh: country data is already up to date.')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Metadata refresh: Created: {job.result['created']}, "
+                f"Updated: {job.result['updated']}, Rows written: {job.result['rows_written']}"
+            ))
+
+    def refresh_rates(self):
+        """Rates-only refresh. It holds the same active job slot as a full refresh, so the two never overlap."""
+        try:
+            with transaction.atomic():
+                job = RefreshJob.objects.create(
+                    status=RefreshJob.STATUS_RUNNING, stage='rates', started_at=timezone.now()
+                )
+        except IntegrityError:
+            self.stdout.write('Full refresh in progress, skipping rates refresh.')
+            return
+
+        outcome = {'status': RefreshJob.STATUS_FAILED}
+        try:
+            result = DataRefreshService.refresh_exchange_rates()
+            if result['rows_written']:
+                SummaryImageGenerator().generate_image()
+                RefreshJobRunner.warm_list_cache()
+            outcome = {'status': RefreshJob.STATUS_SUCCEEDED, 'stage': 'done', 'result': result}
+        except Exception as e:
+            outcome['error'] = str(e)
+            self.stdout.write(self.style.ERROR(f"Rates refresh failed: {str(e)}"))
+            return
+        finally:
+            RefreshJob.objects.filter(pk=job.pk).update(
+                active_key=None, finished_at=timezone.now(), updated_at=timezone.now(), **outcome
+            )
+
+        if result['up_to_date']:
+            self.stdout.write('Rates refresh: exchange rates are already up to date.')
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rates refresh: Updated: {result['updated']}, Unchanged: {result['unchanged']}"
+        ))
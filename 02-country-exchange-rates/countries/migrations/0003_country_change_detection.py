@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('countries', '0002_rename_last_updated_systemstatus_last_refreshed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='country',
+            name='gdp_multiplier',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='source_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('countries', '0004_refreshjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systemstatus',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
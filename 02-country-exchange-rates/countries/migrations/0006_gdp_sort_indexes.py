@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('countries', '0005_systemstatus_data_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='country',
+            name='countries_estimat_d064de_idx',
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['estimated_gdp', 'name'], name='countries_estimat_8a3222_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['-estimated_gdp', 'name'], name='countries_estimat_3ab432_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_name(name):
+    decomposed = unicodedata.normalize('NFKD', name.strip())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def check_name_collisions(apps, schema_editor):
+    """
+    Stop before any schema change if two countries would get the same key.
+    A renamed key couldn't be reached by lookups or refreshes, so the
+    duplicates have to be resolved by hand.
+    """
+    Country = apps.get_model('countries', 'Country')
+    names_by_key = {}
+    for name in Country.objects.order_by('pk').values_list('name', flat=True):
+        names_by_key.setdefault(normalize_name(name), []).append(name)
+
+    collisions = [names for names in names_by_key.values() if len(names) > 1]
+    if collisions:
+        listed = '; '.join(', '.join(repr(name) for name in names) for names in collisions)
+        raise RuntimeError(
+            "Countries whose names only differ by case or accents can't share a name key: "
+            f"{listed}. Delete all but one of each and run migrate again."
+        )
+
+
+def populate_name_keys(apps, schema_editor):
+    Country = apps.get_model('countries', 'Country')
+    countries = list(Country.objects.order_by('pk'))
+    for country in countries:
+        country.name_key = normalize_name(country.name)
+    Country.objects.bulk_update(countries, ['name_key'], batch_size=100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('countries', '0006_gdp_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_name_collisions, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='country',
+            name='name_key',
+            field=models.CharField(max_length=150, null=True),
+        ),
+        migrations.RunPython(populate_name_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='country',
+            name='name_key',
+            field=models.CharField(max_length=150, unique=True),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:37
+
+from decimal import Decimal
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def build_aggregates(apps, schema_editor):
+    """Fill the rollup tables from the existing countries, by one GROUP BY per table."""
+    Country = apps.get_model('countries', 'Country')
+    built_at = django.utils.timezone.now()
+    groups = [
+        (apps.get_model('countries', 'RegionAggregate'), 'region',
+         {'currency_count': models.Count('currency_code', distinct=True)}),
+        (apps.get_model('countries', 'CurrencyAggregate'), 'currency_code', {}),
+    ]
+
+    for model, column, extra in groups:
+        rows = []
+        totals_by_group = Country.objects.order_by().values(column).annotate(
+            country_count=models.Count('id'),
+            total_population=models.Sum('population'),
+            total_gdp=models.Sum('estimated_gdp'),
+            average_gdp=models.Avg('estimated_gdp'),
+            **extra,
+        )
+        for totals in totals_by_group:
+            totals['total_population'] = totals['total_population'] or 0
+            if totals['average_gdp'] is not None:
+                totals['average_gdp'] = Decimal(totals['average_gdp']).quantize(Decimal('0.01'))
+            rows.append(model(**totals, updated_at=built_at))
+        model.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('countries', '0007_country_name_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrencyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency_code', models.CharField(blank=True, max_length=10, null=True, unique=True)),
+                ('country_count', models.IntegerField(default=0)),
+                ('total_population', models.BigIntegerField(default=0)),
+                ('total_gdp', models.DecimalField(blank=True, decimal_places=2, max_digits=40, null=True)),
+                ('average_gdp', models.DecimalField(blank=True, decimal_places=2, max_digits=30, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'currency_aggregates',
+                'ordering': ['currency_code'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RegionAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(blank=True, max_length=50, null=True, unique=True)),
+                ('country_count', models.IntegerField(default=0)),
+                ('total_population', models.BigIntegerField(default=0)),
+                ('total_gdp', models.DecimalField(blank=True, decimal_places=2, max_digits=40, null=True)),
+                ('average_gdp', models.DecimalField(blank=True, decimal_places=2, max_digits=30, null=True)),
+                ('currency_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'region_aggregates',
+                'ordering': ['region'],
+            },
+        ),
+        migrations.RunPython(build_aggregates, migrations.RunPython.noop),
+    ]
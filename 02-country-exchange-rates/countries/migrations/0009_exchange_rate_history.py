@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('countries', '0008_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRateHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency_code', models.CharField(max_length=10)),
+                ('month', models.DateField()),
+                ('sample_count', models.IntegerField(default=0)),
+                ('last_timestamp', models.BigIntegerField(default=0)),
+                ('samples', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'exchange_rate_history',
+                'ordering': ['currency_code', 'month'],
+                'constraints': [models.UniqueConstraint(fields=('currency_code', 'month'), name='unique_currency_month')],
+            },
+        ),
+    ]
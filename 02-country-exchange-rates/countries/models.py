@@ -1,11 +1,16 @@
 from django.db import models
 from django.core.validators import MinValueValidator
 from django.utils import timezone
+import hashlib
+import json
 import random
+import unicodedata
 
 
 class Country(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    # Case-folded, accent-stripped name used for lookups and refresh matching
+    name_key = models.CharField(max_length=150, unique=True)
     capital = models.CharField(max_length=100, null=True, blank=True)
     region = models.CharField(max_length=50, null=True, blank=True)
     population = models.BigIntegerField(validators=[MinValueValidator(0)])
@@ -23,27 +28,53 @@ class Country(models.Model):
         blank=True,
     )
     flag_url = models.URLField(max_length=500, null=True, blank=True)
+    # Fingerprint of the upstream fields last applied, to skip unchanged rows on refresh
+    source_hash = models.CharField(max_length=64, null=True, blank=True)
+    # Drawn once per country so GDP only moves when population or rate do
+    gdp_multiplier = models.FloatField(null=True, blank=True)
     last_refreshed_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Upstream country fields covered by source_hash (exchange rates are compared directly)
+    SOURCE_FIELDS = ('name', 'capital', 'region', 'population', 'currency_code', 'flag_url')
+
     class Meta:
         db_table = 'countries'
         indexes = [
             models.Index(fields=['name']),
             models.Index(fields=['region']),
             models.Index(fields=['currency_code']),
-            models.Index(fields=['estimated_gdp']),
+            # Cover the gdp sorts including their name tiebreak
+            models.Index(fields=['estimated_gdp', 'name']),
+            models.Index(fields=['-estimated_gdp', 'name']),
         ]
 
-    def calculate_estimated_gdp(self):
-        """ Calculate estimated GDP based on population and exchange rate. """
+    @staticmethod
+    def normalize_name(name):
+        """ Lookup key for a country name: "Côte d'Ivoire" and "COTE D'IVOIRE" match """
+        decomposed = unicodedata.normalize('NFKD', name.strip())
+        stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+        return stripped.casefold()
+
+    @classmethod
+    def compute_source_hash(cls, data):
+        """ Hash the upstream-derived country fields from a parsed country dict. """
+        payload = json.dumps([data.get(field) for field in cls.SOURCE_FIELDS], default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def calculate_estimated_gdp(self, rng=random):
+        """
+        Calculate estimated GDP based on population and exchange rate.
+        The random multiplier is drawn (from rng) only if the country has none yet.
+        """
         try:
             if self.population and self.exchange_rate:
                 population = int(self.population)
                 exchange_rate = float(self.exchange_rate)
 
-                random_multiplier = random.uniform(1000, 2000)
-                gdp = (population * random_multiplier) / exchange_rate
+                if self.gdp_multiplier is None:
+                    self.gdp_multiplier = rng.uniform(1000, 2000)
+                gdp = (population * self.gdp_multiplier) / exchange_rate
                 return round(gdp, 2)
             return None
         except (TypeError, ValueError, ZeroDivisionError) as e:
@@ -63,7 +94,9 @@ class Country(models.Model):
                 self.estimated_gdp = float(self.estimated_gdp)
             except (ValueError, TypeError):
                 self.estimated_gdp = None
-                
+
+        self.name_key = self.normalize_name(self.name)
+
         # Calculate estimated GDP before saving
         if self.population and self.exchange_rate:
             self.estimated_gdp = self.calculate_estimated_gdp()
@@ -78,6 +111,8 @@ class Country(models.Model):
 class SystemStatus(models.Model):
     total_countries = models.IntegerField(default=0)
     last_refreshed_at = models.DateTimeField(default=timezone.now)
+    # Bumped whenever the countries table changes, so in-process copies know to reload
+    data_version = models.PositiveIntegerField(default=0)
 
     class Meta:
         db_table = 'system_status'
@@ -90,7 +125,135 @@ class SystemStatus(models.Model):
             status.save()
         return status
     
-    def update_status(self):
-        self.total_countries = Country.objects.count()
+    def update_status(self, total_countries=None):
+        """
+        Record a completed refresh. Refreshes pass the country count they
+        already know; without it the table is counted.
+        """
+        if total_countries is None:
+            total_countries = Country.objects.count()
+        self.total_countries = total_countries
         self.last_refreshed_at = timezone.now()
+        self.data_version = models.F('data_version') + 1
         self.save()
+        self.refresh_from_db(fields=['data_version'])
+
+    def bump_data_version(self, count_delta=None):
+        """
+        Record a change to the countries table outside of a refresh.
+        count_delta adjusts the stored count in place (e.g. -1 for a
+        delete); without it the table is counted.
+        """
+        if count_delta is None:
+            self.total_countries = Country.objects.count()
+        else:
+            self.total_countries = models.F('total_countries') + count_delta
+        self.data_version = models.F('data_version') + 1
+        self.save(update_fields=['total_countries', 'data_version'])
+        self.refresh_from_db(fields=['total_countries', 'data_version'])
+
+
+class RegionAggregate(models.Model):
+    """ Per-region totals, rebuilt at the end of every refresh """
+
+    # Null for countries without a region
+    region = models.CharField(max_length=50, null=True, blank=True, unique=True)
+    country_count = models.IntegerField(default=0)
+    total_population = models.BigIntegerField(default=0)
+    total_gdp = models.DecimalField(max_digits=40, decimal_places=2, null=True, blank=True)
+    average_gdp = models.DecimalField(max_digits=30, decimal_places=2, null=True, blank=True)
+    # Distinct currency codes used in the region
+    currency_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'region_aggregates'
+        ordering = ['region']
+
+    def __str__(self):
+        return f"{self.region}: {self.country_count} countries"
+
+
+class CurrencyAggregate(models.Model):
+    """ Per-currency totals, rebuilt at the end of every refresh """
+
+    # Null for countries without a currency
+    currency_code = models.CharField(max_length=10, null=True, blank=True, unique=True)
+    country_count = models.IntegerField(default=0)
+    total_population = models.BigIntegerField(default=0)
+    total_gdp = models.DecimalField(max_digits=40, decimal_places=2, null=True, blank=True)
+    average_gdp = models.DecimalField(max_digits=30, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'currency_aggregates'
+        ordering = ['currency_code']
+
+    def __str__(self):
+        return f"{self.currency_code}: {self.country_count} countries"
+
+
+class ExchangeRateHistory(models.Model):
+    """
+    One month of USD exchange rates for one currency, packed into a single
+    blob (see RateHistoryStore), so years of hourly samples stay a few
+    rows per currency.
+    """
+
+    currency_code = models.CharField(max_length=10)
+    # First day of the month (UTC) the samples fall in
+    month = models.DateField()
+    sample_count = models.IntegerField(default=0)
+    # Unix time of the newest sample, so repeated rates aren't appended twice
+    last_timestamp = models.BigIntegerField(default=0)
+    samples = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'exchange_rate_history'
+        ordering = ['currency_code', 'month']
+        constraints = [
+            # Also the index range reads use
+            models.UniqueConstraint(fields=['currency_code', 'month'], name='unique_currency_month'),
+        ]
+
+    def __str__(self):
+        return f"{self.currency_code} {self.month:%Y-%m} ({self.sample_count} rates)"
+
+
+class RefreshJob(models.Model):
+    """ Background country refresh, polled through /countries/refresh/<id> """
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_KEY = 'refresh'
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    stage = models.CharField(max_length=50, default='queued')
+    processed = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    force = models.BooleanField(default=False)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    # Set while the job is pending or running; the unique constraint allows
+    # only one active refresh across all worker processes.
+    active_key = models.CharField(max_length=20, null=True, blank=True, unique=True, default=ACTIVE_KEY)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'refresh_jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Refresh job {self.pk} ({self.status})"
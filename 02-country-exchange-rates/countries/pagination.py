@@ -0,0 +1,170 @@
+import base64
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .filters import DEFAULT_SORT, SORT_OPTIONS, sort_ordering
+from .models import Country
+
+# Without a sort parameter the list is in primary key order
+PK_ORDER = [('id', False)]
+
+
+class CountryCursorPagination(BasePagination):
+    """
+    Keyset pagination over every CountryFilter sort option, used only when
+    the request has a limit or cursor parameter (otherwise the whole list
+    is returned as before).
+
+    The cursor holds the sort values of the last row of the page. The next
+    page is the rows strictly after it in the sort's (NULLs last, name
+    tiebreak) ordering, so each page is one indexed range query however
+    deep it is, and rows added or removed between pages don't shift it.
+    """
+
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    max_limit = 1000
+
+    def __init__(self):
+        self.next_cursor = None
+        self.request = None
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.limit_query_param in params
+
+    @staticmethod
+    def sort_of(request):
+        """ The sort option the list is ordered by; None for primary key order """
+        sort = request.query_params.get('sort')
+        if not sort:
+            return None
+        return sort if sort in SORT_OPTIONS else DEFAULT_SORT
+
+    @classmethod
+    def key_fields(cls, sort):
+        return [field for field, _ in (SORT_OPTIONS[sort] if sort else PK_ORDER)]
+
+    def get_limit(self, request):
+        value = request.query_params.get(self.limit_query_param)
+        if value is None:
+            return settings.COUNTRY_PAGE_SIZE
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValueError("limit must be a positive integer")
+        return min(limit, self.max_limit)
+
+    @staticmethod
+    def encode_cursor(sort, values):
+        payload = json.dumps(
+            {'sort': sort, 'after': [str(v) if isinstance(v, Decimal) else v for v in values]},
+            separators=(',', ':'),
+        )
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor, sort, fields):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            after = payload['after']
+            cursor_sort = payload['sort']
+        except (ValueError, TypeError, KeyError):
+            raise ValueError("Invalid cursor")
+        if cursor_sort != sort or not isinstance(after, list) or len(after) != len(fields):
+            raise ValueError("Cursor does not match the sort order")
+        return after
+
+    @staticmethod
+    def after_filter(spec, values):
+        """
+        Q for rows strictly after the row with these sort values, with
+        NULLs sorting last: (a after) OR (a equal AND (b after ...)).
+        """
+        condition = None
+        for (field, descending), value in reversed(list(zip(spec, values))):
+            nullable = Country._meta.get_field(field).null
+            if value is None:
+                # Nothing sorts after NULL except later rows in the NULL group
+                after, equal = None, Q(**{f'{field}__isnull': True})
+            else:
+                after = Q(**{f"{field}__{'lt' if descending else 'gt'}": value})
+                if nullable:
+                    after |= Q(**{f'{field}__isnull': True})
+                equal = Q(**{field: value})
+
+            if condition is not None:
+                tail = equal & condition
+                condition = tail if after is None else after | tail
+            else:
+                condition = after if after is not None else Q(pk__in=[])
+        return condition
+
+    @classmethod
+    def iterate(cls, queryset, sort, chunk_size):
+        """
+        Yield every row of the queryset (which must include the sort's key
+        fields) in the sort's order, fetched chunk_size rows at a time as
+        consecutive keyset pages. Unlike .iterator(), this bounds memory
+        on backends without server-side cursors: mysqlclient holds a
+        query's whole result set in the client.
+        """
+        spec = SORT_OPTIONS[sort] if sort else PK_ORDER
+        fields = cls.key_fields(sort)
+        ordered = queryset.order_by(*sort_ordering(sort, using=queryset.db)) if sort else queryset.order_by('pk')
+        after = None
+        while True:
+            chunk = ordered if after is None else ordered.filter(cls.after_filter(spec, after))
+            rows = list(chunk[:chunk_size])
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            after = [rows[-1][field] for field in fields]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return the page of rows (the queryset must include the sort's key
+        fields), or None when pagination wasn't asked for. Raises
+        ValueError for an invalid limit or cursor.
+        """
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        sort = self.sort_of(request)
+        spec = SORT_OPTIONS[sort] if sort else PK_ORDER
+        fields = self.key_fields(sort)
+        limit = self.get_limit(request)
+
+        queryset = queryset.order_by(*sort_ordering(sort, using=queryset.db)) if sort else queryset.order_by('pk')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after_filter(spec, self.decode_cursor(cursor, sort, fields)))
+
+        rows = list(queryset[:limit + 1])
+        page = rows[:limit]
+        if len(rows) > limit:
+            last = page[-1]
+            self.next_cursor = self.encode_cursor(sort, [last[field] for field in fields])
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -0,0 +1,142 @@
+import json
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.response import Response
+
+RANGE_RE = re.compile(r'^\s*bytes=(\d*)-(\d*)\s*$')
+
+
+class IgnoreAcceptNegotiation(BaseContentNegotiation):
+    """
+    For views that negotiate their own (non-JSON) content type: always use
+    the first renderer for error bodies instead of answering 406 when the
+    client only accepts, say, image/webp.
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON, one object per line. Lets views detect
+    ?format=ndjson or "Accept: application/x-ndjson" through content
+    negotiation; lists are streamed by the view with ndjson_response(),
+    this renders anything else (e.g. error bodies) as a single line.
+    """
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(ndjson_line(item) for item in items)
+
+
+def ndjson_line(item):
+    return json.dumps(item, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def ndjson_response(items, chunk_size=500):
+    """
+    Stream already serialized items as NDJSON, joining chunk_size lines per
+    write so memory stays bounded by one chunk whatever the total.
+    """
+    def stream():
+        chunk = []
+        for item in items:
+            chunk.append(ndjson_line(item))
+            if len(chunk) >= chunk_size:
+                yield b''.join(chunk)
+                chunk = []
+        if chunk:
+            yield b''.join(chunk)
+
+    return StreamingHttpResponse(stream(), content_type=NDJSONRenderer.media_type)
+
+
+class PrerenderedResponse(Response):
+    """
+    Response whose JSON body was rendered ahead of time. data is still set,
+    for tests and for clients asking for a non-default rendering (e.g. indent).
+    """
+
+    def __init__(self, content, data=None, **kwargs):
+        super().__init__(data, **kwargs)
+        self.prerendered_content = content
+
+    @property
+    def rendered_content(self):
+        # Media type parameters (e.g. "; indent=4") change the rendering
+        if ';' in (getattr(self, 'accepted_media_type', None) or ''):
+            return super().rendered_content
+        self['Content-Type'] = self.accepted_renderer.media_type
+        return self.prerendered_content
+
+
+def file_response(request, path, content_type, etag=None):
+    """
+    Serve a file with FileResponse, so WSGI servers can use sendfile, and
+    honour a single byte range ("Range: bytes=start-end"). Multiple ranges,
+    or an If-Range that doesn't match the current ETag, get the whole file.
+    Raises FileNotFoundError if the file is gone.
+    """
+    f = open(path, 'rb')
+    size = os.fstat(f.fileno()).st_size
+    byte_range = _requested_range(request, size, etag)
+
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type)
+    elif byte_range is False:
+        f.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    else:
+        start, end = byte_range
+        with f:
+            f.seek(start)
+            response = HttpResponse(f.read(end - start + 1), content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _requested_range(request, size, etag):
+    """(start, end) of a satisfiable single range, None for the full file, False if unsatisfiable"""
+    header = request.META.get('HTTP_RANGE', '')
+    match = RANGE_RE.match(header)
+    if not match:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and (not etag or if_range.strip() != etag):
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    elif last:
+        # Suffix range: the last N bytes
+        if not int(last):
+            return False
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        return None
+
+    if start >= size:
+        return False
+    return start, end
@@ -1,5 +1,8 @@
-from rest_framework import serializers
-from .models import Country, SystemStatus
+from decimal import Decimal
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .models import Country, CurrencyAggregate, RefreshJob, RegionAggregate, SystemStatus
 
 
 class CountrySerializer(serializers.ModelSerializer):
@@ -19,6 +22,93 @@ class CountrySerializer(serializers.ModelSerializer):
         ]
     
 
+class CountryListSerializer:
+    """
+    Read-only fast path for country lists: turns rows from
+    Country.objects.values(*fields) into the same dicts CountrySerializer
+    produces, without DRF's per-object field machinery. Text and integer
+    columns are passed through; decimals and datetimes use the matching
+    CountrySerializer field's to_representation, so output is identical.
+    """
+
+    FIELDS = CountrySerializer.Meta.fields
+    PASSTHROUGH = (serializers.CharField, serializers.IntegerField)
+
+    def __init__(self, fields=None):
+        self.fields = fields or self.FIELDS
+        serializer_fields = CountrySerializer().fields
+        self.converters = [
+            (field, self._converter(serializer_fields[field])) for field in self.fields
+        ]
+
+    @classmethod
+    def _converter(cls, serializer_field):
+        if isinstance(serializer_field, cls.PASSTHROUGH):
+            return None
+        to_representation = serializer_field.to_representation
+
+        if (
+            isinstance(serializer_field, serializers.DecimalField)
+            and getattr(serializer_field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+            and serializer_field.decimal_places is not None
+            and not serializer_field.localize
+            and not serializer_field.normalize_output
+        ):
+            # The database returns decimals already at the column's scale,
+            # which DRF would only re-quantize before formatting
+            exponent = -serializer_field.decimal_places
+
+            def convert_decimal(value):
+                if isinstance(value, Decimal) and value.as_tuple().exponent == exponent:
+                    return f'{value:f}'
+                return to_representation(value)
+            return convert_decimal
+
+        output_format = getattr(serializer_field, 'format', api_settings.DATETIME_FORMAT)
+        if isinstance(serializer_field, serializers.DateTimeField) and output_format == ISO_8601:
+            # Same conversion as DRF (current time zone, ISO 8601, Z for UTC),
+            # looking the time zone up once instead of per value
+            enforce_timezone = serializer_field.enforce_timezone
+            tz = getattr(serializer_field, 'timezone', None) or serializer_field.default_timezone()
+
+            def convert_datetime(value):
+                if tz is not None and value.tzinfo is not None:
+                    value = value.astimezone(tz)
+                else:
+                    value = enforce_timezone(value)
+                value = value.isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return convert_datetime
+
+        return to_representation
+
+    @classmethod
+    def parse_fields(cls, value):
+        """
+        Parse a fields= query parameter ("name,region") into a tuple in
+        canonical order, or None for all fields. Raises ValueError naming
+        any unknown field.
+        """
+        requested = {field.strip() for field in (value or '').split(',') if field.strip()}
+        if not requested:
+            return None
+        unknown = requested.difference(cls.FIELDS)
+        if unknown:
+            raise ValueError(', '.join(sorted(unknown)))
+        return tuple(field for field in cls.FIELDS if field in requested)
+
+    def to_representation(self, row):
+        data = {}
+        for field, convert in self.converters:
+            value = row[field]
+            data[field] = value if convert is None or value is None else convert(value)
+        return data
+
+    def serialize(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
 class SystemStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = SystemStatus
@@ -26,3 +116,48 @@ class SystemStatusSerializer(serializers.ModelSerializer):
             'total_countries',
             'last_refreshed_at',
         ]
+
+
+class RefreshJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RefreshJob
+        fields = [
+            'id',
+            'status',
+            'stage',
+            'processed',
+            'total',
+            'force',
+            'result',
+            'error',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
+
+
+class RegionAggregateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RegionAggregate
+        fields = [
+            'region',
+            'country_count',
+            'total_population',
+            'total_gdp',
+            'average_gdp',
+            'currency_count',
+            'updated_at',
+        ]
+
+
+class CurrencyAggregateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CurrencyAggregate
+        fields = [
+            'currency_code',
+            'country_count',
+            'total_population',
+            'total_gdp',
+            'average_gdp',
+            'updated_at',
+        ]
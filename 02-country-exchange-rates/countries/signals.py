@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Country, SystemStatus
+from .utils.snapshot import country_snapshot
+from .utils.status_cache import status_cache
+
+
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+@receiver(post_save, sender=SystemStatus)
+def invalidate_country_snapshot(sender, **kwargs):
+    country_snapshot.invalidate()
+
+
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+@receiver(post_save, sender=SystemStatus)
+def invalidate_status_cache(sender, **kwargs):
+    status_cache.invalidate()
@@ -1,11 +1,27 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch, MagicMock
+import tempfile
+from datetime import date, datetime, timezone as dt_timezone
+import threading
+import time
+import zlib
 from countries.utils.external_apis import CountryDataFetcher, ExchangeRateFetcher, DataRefreshService, ExternalAPIError
-from countries.models import Country
+from countries.management.commands.run_refresh_scheduler import Command
+from countries.utils.gdp import GDPCalculator
+from countries.utils.image_generator import SummaryImageGenerator
+from countries.utils.rate_history import RateHistoryStore
+from countries.utils.refresh_jobs import RefreshJobRunner
+from countries.utils.upstream_cache import FetchResult
+from countries.models import Country, CurrencyAggregate, ExchangeRateHistory, RefreshJob, RegionAggregate
 import json
+from decimal import Decimal
+from io import StringIO
 
 class ExternalAPIsTest(TestCase):
-    @patch('countries.utils.external_apis.requests.get')
+    @patch('countries.utils.external_apis.requests.Session.get')
     def test_country_data_fetcher_success(self, mock_get):
         """Test successful country data fetching"""
         mock_response = MagicMock()
@@ -28,7 +44,7 @@ class ExternalAPIsTest(TestCase):
         self.assertEqual(countries[0]['name'], 'Test Country')
         self.assertEqual(countries[0]['population'], 1000000)  # Should be int
     
-    @patch('countries.utils.external_apis.requests.get')
+    @patch('countries.utils.external_apis.requests.Session.get')
     def test_exchange_rate_fetcher_success(self, mock_get):
         """Test successful exchange rate fetching"""
         mock_response = MagicMock()
@@ -64,4 +80,491 @@ class ExternalAPIsTest(TestCase):
         
         # Other fields should maintain correct types
         self.assertIsInstance(parsed['name'], str)
-        self.assertIsInstance(parsed['currency_code'], str)
\ No newline at end of file
+        self.assertIsInstance(parsed['currency_code'], str)
+
+
+class DataRefreshServiceTest(TestCase):
+    def setUp(self):
+        self.countries_payload = [
+            {
+                'name': 'Nigeria',
+                'capital': 'Abuja',
+                'region': 'Africa',
+                'population': 206139589,
+                'flag': 'https://flagcdn.com/ng.svg',
+                'currencies': [{'code': 'NGN'}]
+            },
+            {
+                'name': 'Ghana',
+                'capital': 'Accra',
+                'region': 'Africa',
+                'population': 31072940,
+                'flag': 'https://flagcdn.com/gh.svg',
+                'currencies': [{'code': 'GHS'}]
+            },
+            {
+                'capital': 'Nowhere',
+                'population': 10,
+            },
+        ]
+        self.rates = {'NGN': 1600.0, 'GHS': 15.0}
+
+    def refresh(self, countries_changed=True, rates_changed=True):
+        countries = FetchResult(self.countries_payload, countries_changed)
+        rates = FetchResult(self.rates, rates_changed)
+        with patch.object(CountryDataFetcher, 'fetch_all_countries_if_changed', return_value=countries), \
+                patch.object(ExchangeRateFetcher, 'fetch_exchange_rate_if_changed', return_value=rates):
+            return DataRefreshService.refresh_country_data()
+
+    def test_refresh_creates_countries(self):
+        """Test that a first refresh creates every valid country"""
+        result = self.refresh()
+
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(result['updated'], 0)
+        self.assertEqual(result['skipped'], 1)
+        nigeria = Country.objects.get(name='Nigeria')
+        self.assertEqual(nigeria.currency_code, 'NGN')
+        self.assertIsNotNone(nigeria.estimated_gdp)
+
+    def test_refresh_rebuilds_aggregates(self):
+        """Test that the rollup tables match the refreshed countries"""
+        self.refresh()
+
+        africa = RegionAggregate.objects.get(region='Africa')
+        countries = Country.objects.filter(region='Africa')
+        self.assertEqual(africa.country_count, 2)
+        self.assertEqual(africa.total_population, 206139589 + 31072940)
+        self.assertEqual(africa.currency_count, 2)
+        self.assertAlmostEqual(
+            float(africa.total_gdp), sum(float(c.estimated_gdp) for c in countries), delta=0.05
+        )
+        self.assertAlmostEqual(float(africa.average_gdp), float(africa.total_gdp) / 2, delta=0.05)
+        self.assertEqual(CurrencyAggregate.objects.get(currency_code='GHS').country_count, 1)
+
+    def test_refresh_appends_rate_history(self):
+        """Test that changed rates are appended once per upstream update"""
+        self.refresh()
+        self.refresh(countries_changed=False, rates_changed=False)
+
+        self.assertEqual(ExchangeRateHistory.objects.count(), 2)
+        row = ExchangeRateHistory.objects.get(currency_code='NGN')
+        samples = RateHistoryStore.decode(row.month, row.sample_count, row.samples)
+        self.assertEqual([rate for _, rate in samples], [1600.0])
+
+    def test_refresh_updates_existing_countries_case_insensitively(self):
+        """Test that existing countries are matched by name regardless of case"""
+        Country.objects.create(name='NIGERIA', population=1, capital='Old Capital')
+
+        result = self.refresh()
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(Country.objects.count(), 2)
+        nigeria = Country.objects.get(name__iexact='nigeria')
+        self.assertEqual(nigeria.name, 'NIGERIA')
+        self.assertEqual(nigeria.capital, 'Abuja')
+        self.assertEqual(nigeria.population, 206139589)
+
+    def test_refresh_matches_names_without_accents(self):
+        """Test that an accented upstream name updates the unaccented stored row"""
+        Country.objects.create(name='Cote dIvoire', population=1)
+        self.countries_payload.append(
+            {'name': 'Côte dIvoire', 'population': 26378274, 'currencies': [{'code': 'XOF'}]}
+        )
+
+        result = self.refresh()
+
+        self.assertEqual(result['updated'], 1)
+        country = Country.objects.get(name_key=Country.normalize_name('CÔTE DIVOIRE'))
+        self.assertEqual(country.name, 'Cote dIvoire')
+        self.assertEqual(country.population, 26378274)
+
+    def test_refresh_uses_constant_number_of_queries(self):
+        """Test that refresh cost doesn't grow with one query per country"""
+        self.countries_payload += [
+            {'name': f'Country {i}', 'population': 1000 + i, 'currencies': [{'code': 'NGN'}]}
+            for i in range(50)
+        ]
+        self.refresh()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.refresh()
+        # Includes a fixed six queries (select, delete, insert per table) to rebuild
+        # the region and currency rollups, and up to three to append rate history
+        self.assertLess(len(queries), 17)
+
+    def test_unchanged_countries_are_not_rewritten(self):
+        """Test that a refresh with identical source data writes no rows"""
+        self.refresh()
+        gdp_before = Country.objects.get(name='Nigeria').estimated_gdp
+
+        result = self.refresh()
+
+        self.assertEqual(result['rows_written'], 0)
+        self.assertEqual(result['unchanged'], 2)
+        self.assertEqual(result['updated'], 0)
+        self.assertEqual(Country.objects.get(name='Nigeria').estimated_gdp, gdp_before)
+
+    def test_changed_country_keeps_its_gdp_multiplier(self):
+        """Test that only changed rows are written and GDP follows the new inputs"""
+        self.refresh()
+        before = Country.objects.get(name='Nigeria')
+
+        self.rates['NGN'] = 3200.0
+        result = self.refresh()
+
+        after = Country.objects.get(name='Nigeria')
+        self.assertEqual(result['rows_written'], 1)
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(after.gdp_multiplier, before.gdp_multiplier)
+        self.assertAlmostEqual(float(after.estimated_gdp), float(before.estimated_gdp) / 2, delta=1)
+
+    def test_refresh_seed_makes_multipliers_reproducible(self):
+        """Test that the same seed draws the same multipliers"""
+        with patch.object(CountryDataFetcher, 'fetch_all_countries_if_changed',
+                          return_value=FetchResult(self.countries_payload, True)), \
+                patch.object(ExchangeRateFetcher, 'fetch_exchange_rate_if_changed',
+                             return_value=FetchResult(self.rates, True)):
+            DataRefreshService.refresh_country_data(seed=7)
+            first = Country.objects.get(name='Ghana').gdp_multiplier
+            Country.objects.all().delete()
+            result = DataRefreshService.refresh_country_data(seed=7)
+
+        self.assertEqual(result['gdp_seed'], 7)
+        self.assertEqual(Country.objects.get(name='Ghana').gdp_multiplier, first)
+
+    def test_refresh_skips_writes_when_sources_unchanged(self):
+        """Test that nothing is written when neither upstream changed"""
+        self.refresh()
+
+        with CaptureQueriesContext(connection) as queries:
+            result = self.refresh(countries_changed=False, rates_changed=False)
+
+        self.assertTrue(result['up_to_date'])
+        self.assertEqual(result['updated'], 0)
+        self.assertEqual(len(queries), 1)  # existence check only
+
+    def test_refresh_skips_oversized_rows(self):
+        """Test that a row that doesn't fit its columns is skipped, not fatal"""
+        self.countries_payload[1]['region'] = 'R' * 200
+
+        result = self.refresh()
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(result['skipped'], 2)
+        self.assertFalse(Country.objects.filter(name='Ghana').exists())
+
+    def refresh_rates(self, changed=True):
+        rates = FetchResult(self.rates, changed)
+        with patch.object(ExchangeRateFetcher, 'fetch_exchange_rate_if_changed', return_value=rates), \
+                patch.object(CountryDataFetcher, 'fetch_all_countries_if_changed') as fetch_countries:
+            result = DataRefreshService.refresh_exchange_rates()
+        fetch_countries.assert_not_called()
+        return result
+
+    def test_rates_refresh_updates_only_rate_and_gdp(self):
+        """Test that a rates-only refresh rewrites just the changed rates"""
+        self.refresh()
+        nigeria = Country.objects.get(name='Nigeria')
+        self.rates['NGN'] = 800.0
+
+        with CaptureQueriesContext(connection) as queries:
+            result = self.refresh_rates()
+
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(result['unchanged'], 1)
+        table = connection.ops.quote_name(Country._meta.db_table)
+        updates = [q['sql'] for q in queries if q['sql'].startswith(f'UPDATE {table}')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn(connection.ops.quote_name('capital'), updates[0])
+
+        updated = Country.objects.get(name='Nigeria')
+        self.assertEqual(updated.exchange_rate, Decimal('800'))
+        self.assertEqual(updated.gdp_multiplier, nigeria.gdp_multiplier)
+        self.assertAlmostEqual(float(updated.estimated_gdp), float(nigeria.estimated_gdp) * 2, delta=1)
+
+    def test_rates_refresh_skips_when_rates_unchanged(self):
+        """Test that unchanged rates write nothing"""
+        self.refresh()
+
+        result = self.refresh_rates(changed=False)
+
+        self.assertTrue(result['up_to_date'])
+        self.assertEqual(result['rows_written'], 0)
+
+    def scheduler_refresh_rates(self):
+        command = Command(stdout=StringIO())
+        rates = FetchResult(self.rates, True)
+        with patch.object(ExchangeRateFetcher, 'fetch_exchange_rate_if_changed', return_value=rates), \
+                patch.object(SummaryImageGenerator, 'generate_image'), \
+                patch.object(RefreshJobRunner, 'warm_list_cache') as warm:
+            command.refresh_rates()
+        return command.stdout.getvalue(), warm
+
+    def test_scheduler_rates_refresh_skips_while_refresh_is_active(self):
+        """Test that the scheduler's rates refresh doesn't overlap an active full refresh"""
+        self.refresh()
+        RefreshJob.objects.create()
+        self.rates['NGN'] = 800.0
+
+        output, warm = self.scheduler_refresh_rates()
+
+        self.assertIn('skipping rates refresh', output)
+        self.assertEqual(Country.objects.get(name='Nigeria').exchange_rate, Decimal('1600'))
+        warm.assert_not_called()
+
+    def test_scheduler_rates_refresh_releases_its_slot(self):
+        """Test that the scheduler's rates refresh holds the active slot only while it runs"""
+        self.refresh()
+        self.rates['NGN'] = 800.0
+
+        output, warm = self.scheduler_refresh_rates()
+
+        self.assertIn('Updated: 1', output)
+        warm.assert_called_once()
+        job = RefreshJob.objects.get()
+        self.assertEqual(job.status, RefreshJob.STATUS_SUCCEEDED)
+        self.assertIsNone(job.active_key)
+        self.assertEqual(RefreshJobRunner.submit(background=False)[1], True)
+
+
+class GDPCalculatorTest(SimpleTestCase):
+    def make_countries(self):
+        rates = [Decimal('1500.5'), Decimal('0'), None, Decimal('3.25'), Decimal('0.000001')]
+        populations = [200000000, 5000000, 1000000, 0, 30000]
+        return [
+            Country(name=f'Country {i}', name_key=f'country {i}', population=population, exchange_rate=rate)
+            for i, (population, rate) in enumerate(zip(populations, rates))
+        ]
+
+    def test_vectorized_matches_row_by_row(self):
+        """Test that the NumPy path and the fallback agree, including zero and missing rates"""
+        vectorized = self.make_countries()
+        GDPCalculator.assign(vectorized, seed=7)
+        with patch('countries.utils.gdp.np', None):
+            fallback = self.make_countries()
+            GDPCalculator.assign(fallback, seed=7)
+
+        for a, b in zip(vectorized, fallback):
+            self.assertEqual(a.gdp_multiplier, b.gdp_multiplier)
+            if b.estimated_gdp is None:
+                self.assertIsNone(a.estimated_gdp)
+            else:
+                self.assertAlmostEqual(a.estimated_gdp, b.estimated_gdp, places=2)
+        self.assertEqual([c.estimated_gdp is None for c in vectorized], [False, True, True, True, False])
+
+    def test_fallback_is_logged_once(self):
+        """Test that running without NumPy warns once per process"""
+        with patch('countries.utils.gdp.np', None), patch.object(GDPCalculator, '_fallback_logged', False):
+            with self.assertLogs('countries.utils.gdp', level='WARNING') as logs:
+                GDPCalculator.assign(self.make_countries(), seed=7)
+                GDPCalculator.assign(self.make_countries(), seed=7)
+
+        self.assertEqual(len(logs.records), 1)
+
+    def test_multipliers_do_not_depend_on_batch(self):
+        """Test that a country draws the same multiplier alone or in a batch"""
+        batch = self.make_countries()
+        GDPCalculator.assign(batch, seed=7)
+        alone = self.make_countries()[-1:]
+        GDPCalculator.assign(alone, seed=7)
+        self.assertEqual(alone[0].gdp_multiplier, batch[-1].gdp_multiplier)
+
+    def test_stored_multiplier_is_kept(self):
+        country = Country(name='Kept', name_key='kept', population=1000, exchange_rate=Decimal('2'), gdp_multiplier=1500.0)
+        GDPCalculator.assign([country], seed=7)
+        self.assertEqual(country.gdp_multiplier, 1500.0)
+        self.assertEqual(country.estimated_gdp, 750000.0)
+
+
+class RateHistoryStoreTest(TestCase):
+    START = 1704067200  # 2024-01-01T00:00:00Z
+
+    def test_round_trip_across_months(self):
+        """Test that hourly samples spanning months are stored per month and read back exactly"""
+        samples = [(self.START + hour * 3600, 1500 + hour * 0.25) for hour in range(24 * 45)]
+        self.assertEqual(RateHistoryStore.record({'NGN': samples}), len(samples))
+
+        self.assertEqual(ExchangeRateHistory.objects.filter(currency_code='NGN').count(), 2)
+        start = datetime.fromtimestamp(self.START + 3600 * 10, dt_timezone.utc)
+        end = datetime.fromtimestamp(self.START + 3600 * 24 * 40, dt_timezone.utc)
+        with CaptureQueriesContext(connection) as queries:
+            read = RateHistoryStore.read('NGN', start, end)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            [(moment.timestamp(), rate) for moment, rate in read],
+            [sample for sample in samples if start.timestamp() <= sample[0] <= end.timestamp()],
+        )
+
+    def test_samples_are_appended_once(self):
+        """Test that older or repeated samples are ignored and new ones are appended"""
+        RateHistoryStore.record_rates({'NGN': 1600.0, 'GHS': 15.0}, self.START)
+        self.assertEqual(RateHistoryStore.record_rates({'NGN': 1601.0}, self.START), 0)
+        self.assertEqual(RateHistoryStore.record_rates({'NGN': 1602.0}, self.START + 3600), 1)
+
+        row = ExchangeRateHistory.objects.get(currency_code='NGN')
+        self.assertEqual(row.sample_count, 2)
+        self.assertEqual(
+            RateHistoryStore.decode(row.month, row.sample_count, row.samples),
+            [(self.START, 1600.0), (self.START + 3600, 1602.0)],
+        )
+
+    def test_encoding_is_little_endian(self):
+        """Test that the stored layout is 4-byte deltas then 8-byte rates, little-endian"""
+        blob = RateHistoryStore.encode(date(2024, 1, 1), [(self.START + 60, 1.5), (self.START + 180, 2.0)])
+
+        self.assertEqual(
+            zlib.decompress(blob),
+            b'\x3c\x00\x00\x00' + b'\x78\x00\x00\x00' + b'\x00\x00\x00\x00\x00\x00\xf8\x3f' + b'\x00' * 7 + b'\x40',
+        )
+
+
+class DelayedUpstreamHandler(BaseHTTPRequestHandler):
+    """Stub upstream that answers after a per-path delay"""
+    delay = 0.5
+    payloads = {
+        '/countries': [{'name': 'Test Country', 'population': 1000, 'currencies': [{'code': 'USD'}]}],
+        '/rates': {'result': 'success', 'rates': {'USD': 1.0}},
+    }
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        time.sleep(self.delay)
+        body = json.dumps(self.payloads[path]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubUpstreamTestCase(SimpleTestCase):
+    """Runs a local stub upstream and points both fetchers at it"""
+    handler = None
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        patches = [
+            patch.object(CountryDataFetcher, 'BASE_URL', f'{base_url}/countries'),
+            patch.object(ExchangeRateFetcher, 'BASE_URL', f'{base_url}/rates'),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        settings_override = override_settings(CACHE_DIR=cache_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ParallelFetchTest(StubUpstreamTestCase):
+    handler = DelayedUpstreamHandler
+
+    def test_sources_are_fetched_concurrently(self):
+        """Test that fetch latency is the slower upstream, not the sum of both"""
+        started = time.perf_counter()
+        countries, rates, timings = DataRefreshService.fetch_sources()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(countries.data[0]['name'], 'Test Country')
+        self.assertEqual(rates.data['USD'], 1.0)
+        self.assertGreaterEqual(timings['countries_ms'], 500)
+        self.assertGreaterEqual(timings['exchange_rates_ms'], 500)
+        self.assertLess(elapsed, 0.9)
+
+
+class ConditionalUpstreamHandler(BaseHTTPRequestHandler):
+    """Stub upstream that supports ETags and counts requests"""
+    etag = '"v1"'
+    requests_seen = []
+    next_update = 0
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        self.requests_seen.append(path)
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        if path == '/countries':
+            payload = [{'name': 'Test Country', 'population': 1000, 'currencies': [{'code': 'USD'}]}]
+        else:
+            payload = {
+                'result': 'success',
+                'rates': {'USD': 1.0},
+                'time_last_update_unix': 0,
+                'time_next_update_unix': self.next_update,
+            }
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ConditionalFetchTest(StubUpstreamTestCase):
+    handler = ConditionalUpstreamHandler
+
+    def setUp(self):
+        super().setUp()
+        ConditionalUpstreamHandler.requests_seen = []
+        ConditionalUpstreamHandler.next_update = 0
+
+    def test_not_modified_countries_are_served_from_disk(self):
+        """Test that a 304 is reported as unchanged with the cached body"""
+        first = CountryDataFetcher.fetch_all_countries_if_changed()
+        self.assertTrue(first.changed)
+        CountryDataFetcher.cache.save(first.cache_entry)
+
+        second = CountryDataFetcher.fetch_all_countries_if_changed()
+
+        self.assertFalse(second.changed)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(len(ConditionalUpstreamHandler.requests_seen), 2)
+
+    def test_unapplied_response_is_not_cached(self):
+        """Test that a response is only remembered once it has been saved"""
+        CountryDataFetcher.fetch_all_countries_if_changed()
+
+        result = CountryDataFetcher.fetch_all_countries_if_changed()
+
+        self.assertTrue(result.changed)
+
+    def test_rates_are_not_refetched_before_next_update(self):
+        """Test that no request is made while the cached rates are current"""
+        ConditionalUpstreamHandler.next_update = int(time.time()) + 3600
+        first = ExchangeRateFetcher.fetch_exchange_rate_if_changed()
+        ExchangeRateFetcher.cache.save(first.cache_entry)
+
+        second = ExchangeRateFetcher.fetch_exchange_rate_if_changed()
+
+        self.assertFalse(second.changed)
+        self.assertEqual(second.data, {'USD': 1.0})
+        self.assertEqual(len(ConditionalUpstreamHandler.requests_seen), 1)
+
+    def test_force_ignores_cache(self):
+        """Test that a forced fetch always reports changed data"""
+        first = CountryDataFetcher.fetch_all_countries_if_changed()
+        CountryDataFetcher.cache.save(first.cache_entry)
+
+        result = CountryDataFetcher.fetch_all_countries_if_changed(force=True)
+
+        self.assertTrue(result.changed)
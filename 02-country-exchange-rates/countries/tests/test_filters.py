@@ -1,7 +1,9 @@
+from django.db import connection
 from django.test import TestCase
 from countries.models import Country
-from countries.filters import CountryFilter
+from countries.filters import CountryFilter, SORT_OPTIONS
 from decimal import Decimal
+import unittest
 
 class CountryFilterTest(TestCase):
     def setUp(self):
@@ -51,4 +53,53 @@ class CountryFilterTest(TestCase):
         # With our simple approach, NULLs come last in descending too
         self.assertEqual(sorted_countries[0].name, 'High GDP Country')
         self.assertEqual(sorted_countries[1].name, 'Low GDP Country') 
-        self.assertEqual(sorted_countries[2].name, 'No GDP Country')  # NULLs last
\ No newline at end of file
+        self.assertEqual(sorted_countries[2].name, 'No GDP Country')  # NULLs last
+
+    def test_gdp_asc_is_a_single_filterable_query(self):
+        """Test that the gdp_asc result can be filtered and sliced further"""
+        sorted_qs = CountryFilter().filter_sort(Country.objects.all(), 'sort', 'gdp_asc')
+
+        self.assertNotIn('UNION', str(sorted_qs.query))
+        self.assertEqual(
+            [c.name for c in sorted_qs.filter(population__lt=50000000)[:2]],
+            ['Low GDP Country', 'No GDP Country'],
+        )
+
+    def test_sorts_break_ties_by_name(self):
+        """Test that every sort option orders equal values by name"""
+        Country.objects.create(name='Another GDP Country', population=5000000, exchange_rate=Decimal('1.0'))
+        Country.objects.create(name='Another No GDP Country', population=1000000)
+        # save() derives GDP with a random multiplier, so set equal values directly
+        Country.objects.filter(name__in=['Another GDP Country', 'Low GDP Country']).update(
+            estimated_gdp=Decimal('7500000000.0')
+        )
+
+        for sort in SORT_OPTIONS:
+            with self.subTest(sort=sort):
+                names = [c.name for c in CountryFilter().filter_sort(Country.objects.all(), 'sort', sort)]
+                if sort.startswith('gdp'):
+                    self.assertLess(names.index('Another GDP Country'), names.index('Low GDP Country'))
+                    self.assertEqual(names[-2:], ['Another No GDP Country', 'No GDP Country'])
+                if sort.startswith('population'):
+                    self.assertLess(names.index('Another No GDP Country'), names.index('No GDP Country'))
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'query plans are SQLite specific')
+class CountrySortPlanTest(TestCase):
+    def explain(self, sort):
+        queryset = CountryFilter().filter_sort(Country.objects.all(), 'sort', sort)
+        return queryset.explain()
+
+    def test_gdp_sorts_walk_an_index(self):
+        """Test that gdp sorts read the (estimated_gdp, name) indexes without a sort step"""
+        for sort in ('gdp_asc', 'gdp_desc'):
+            with self.subTest(sort=sort):
+                plan = self.explain(sort)
+                self.assertIn('USING INDEX countries_estimat', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_name_sorts_walk_the_unique_index(self):
+        """Test that name sorts don't need a sort step"""
+        for sort in ('name_asc', 'name_desc'):
+            with self.subTest(sort=sort):
+                self.assertNotIn('TEMP B-TREE', self.explain(sort))
@@ -1,9 +1,27 @@
-from django.test import TestCase
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from countries.models import Country, SystemStatus
+from unittest.mock import patch
+from PIL import Image
+from countries.models import Country, RefreshJob, RegionAggregate, SystemStatus
+from countries.serializers import CountryListSerializer, CountrySerializer
+from countries.utils.aggregates import AggregateBuilder
+from countries.utils.external_apis import ExternalAPIError
+from countries.utils.rate_history import RateHistoryStore
+from countries.utils.refresh_jobs import RefreshJobRunner
+from countries.utils.image_generator import SummaryImageGenerator, negotiate_format
+from countries.utils.snapshot import CountrySnapshot, country_snapshot
+from countries.views import CountryViewSet
 from decimal import Decimal
+import json
+import io
+import os
+import tempfile
+import threading
 
 class CountryViewSetTest(APITestCase):
     def setUp(self):
@@ -53,6 +71,18 @@ class CountryViewSetTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], 'Nigeria')
     
+    def test_get_country_ignores_accents(self):
+        """Test that lookups use the normalized name key"""
+        Country.objects.create(name="Côte d'Ivoire", population=26378274)
+        url = reverse('country-detail', kwargs={'name': "COTE D'IVOIRE"})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], "Côte d'Ivoire")
+        self.assertIn(f"{connection.ops.quote_name('name_key')} =", queries[0]['sql'])
+
     def test_get_nonexistent_country(self):
         """Test 404 for non-existent country"""
         url = reverse('country-detail', kwargs={'name': 'Nonexistent'})
@@ -112,6 +142,616 @@ class CountryViewSetTest(APITestCase):
         self.assertEqual(countries[1]['name'], 'Ghana') 
         self.assertEqual(countries[2]['name'], 'United States')
 
+class CountrySnapshotTest(APITestCase):
+    def setUp(self):
+        # Query popularity is process-wide; don't warm lists from other tests
+        country_snapshot._popularity.clear()
+        for name, region, currency, population, rate in [
+            ('Nigeria', 'Africa', 'NGN', 206139589, '1600'),
+            ('Ghana', 'Africa', 'GHS', 31072940, '15'),
+            ('Kenya', 'Africa', 'KES', 53771296, None),
+            ('France', 'Europe', 'EUR', 67391582, '0.92'),
+            ('Germany', 'Europe', 'EUR', 83240525, '0.92'),
+        ]:
+            Country.objects.create(
+                name=name, region=region, currency_code=currency, population=population,
+                exchange_rate=Decimal(rate) if rate else None,
+            )
+
+    def test_snapshot_matches_database_path(self):
+        """Test that in-memory filtering and sorting match CountryFilter"""
+        url = reverse('country-list')
+        queries = [
+            '', '?region=africa', '?currency=eur', '?currency_code=EUR', '?region=Europe&sort=name_desc',
+            '?sort=gdp_asc', '?sort=gdp_desc', '?sort=population_asc', '?sort=population_desc', '?sort=unknown',
+        ]
+        for query in queries:
+            with self.subTest(query=query):
+                fast = self.client.get(url + query)
+                with override_settings(COUNTRY_SNAPSHOT_ENABLED=False):
+                    slow = self.client.get(url + query)
+                self.assertEqual(fast.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    [c['name'] for c in fast.data], [c['name'] for c in slow.data]
+                )
+                self.assertEqual(fast.data, slow.data)
+
+    def test_fields_limit_output_on_both_paths(self):
+        """Test that fields= returns only the requested fields, in the same order on both paths"""
+        url = reverse('country-list') + '?fields=estimated_gdp,name,region,name&sort=gdp_desc'
+        fast = self.client.get(url)
+        with override_settings(COUNTRY_SNAPSHOT_ENABLED=False):
+            with CaptureQueriesContext(connection) as queries:
+                slow = self.client.get(url)
+
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.data, slow.data)
+        self.assertEqual(list(fast.data[0]), ['name', 'region', 'estimated_gdp'])
+        select = queries[0]['sql'].split(' FROM ')[0]
+        self.assertIn(connection.ops.quote_name('estimated_gdp'), select)
+        self.assertNotIn('flag_url', select)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse('country-list') + '?fields=name,secret')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('secret', response.data['error'])
+
+    def test_list_serializer_matches_model_serializer(self):
+        """Test that the fast list serializer produces CountrySerializer's output"""
+        countries = Country.objects.order_by('name')
+        self.assertEqual(
+            CountryListSerializer().serialize(countries.values(*CountryListSerializer.FIELDS)),
+            CountrySerializer(countries, many=True).data,
+        )
+
+    def test_list_is_served_without_queries(self):
+        """Test that a warm snapshot doesn't touch the database"""
+        url = reverse('country-list')
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url + '?region=Europe')
+
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(queries), 0)
+
+    def test_delete_reloads_snapshot(self):
+        """Test that deleted countries disappear from the list"""
+        url = reverse('country-list')
+        self.client.get(url)
+
+        self.client.delete(reverse('country-detail', kwargs={'name': 'ghana'}))
+
+        names = [c['name'] for c in self.client.get(url).data]
+        self.assertNotIn('Ghana', names)
+        self.assertEqual(SystemStatus.get_current_status().total_countries, 4)
+
+    def test_rendered_list_is_cached_per_normalized_query(self):
+        """Test that equivalent queries share one rendered response"""
+        url = reverse('country-list')
+        first = self.client.get(url + '?region=Europe&page=2')
+
+        snapshot = country_snapshot.get()
+        self.assertEqual(len(snapshot.rendered), 1)
+        second = self.client.get(url + '?region=EUROPE')
+
+        self.assertEqual(len(snapshot.rendered), 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second['Content-Type'], 'application/json')
+        self.assertEqual([c['name'] for c in json.loads(second.content)], ['France', 'Germany'])
+
+    def test_refresh_discards_rendered_lists_and_warms_popular_ones(self):
+        """Test that a refresh replaces the cache and pre-renders popular queries"""
+        url = reverse('country-list')
+        self.client.get(url + '?sort=gdp_desc')
+        self.client.get(url + '?sort=gdp_desc')
+        old = country_snapshot.get()
+
+        Country.objects.filter(name='France').delete()
+        SystemStatus.get_current_status().update_status()
+        country_snapshot.warm()
+
+        snapshot = country_snapshot.get()
+        self.assertIsNot(snapshot, old)
+        self.assertIn(CountrySnapshot.normalize({'sort': 'gdp_desc'}), snapshot.rendered)
+        names = [c['name'] for c in self.client.get(url + '?sort=gdp_desc').data]
+        self.assertNotIn('France', names)
+
+    def test_list_after_create(self):
+        """Test that a country created through the API shows up in the cached list and rollups"""
+        url = reverse('country-list')
+        self.client.get(url)
+
+        response = self.client.post(url, {'name': 'Togo', 'region': 'Africa', 'population': 8000000}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('Togo', [c['name'] for c in self.client.get(url).data])
+        self.assertEqual(SystemStatus.get_current_status().total_countries, 6)
+        self.assertEqual(RegionAggregate.objects.get(region='Africa').country_count, 4)
+
+    def test_list_after_update(self):
+        """Test that a country updated through the API is changed in the cached list and rollups"""
+        url = reverse('country-list')
+        self.client.get(url + '?region=Europe')
+        version = SystemStatus.get_current_status().data_version
+
+        response = self.client.put(
+            reverse('country-detail', kwargs={'name': 'France'}),
+            {'name': 'France', 'region': 'Africa', 'population': 67391582},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['name'] for c in self.client.get(url + '?region=Europe').data], ['Germany'])
+        status_row = SystemStatus.get_current_status()
+        self.assertEqual(status_row.data_version, version + 1)
+        self.assertEqual(status_row.total_countries, 5)
+        self.assertEqual(RegionAggregate.objects.get(region='Africa').country_count, 4)
+
+    @override_settings(COUNTRY_SNAPSHOT_CHECK_INTERVAL=0)
+    def test_change_from_another_process_warms_popular_lists(self):
+        """Test that a worker renders its popular lists when it sees a new data version"""
+        url = reverse('country-list')
+        SystemStatus.get_current_status()
+        self.client.get(url + '?sort=gdp_desc')
+        old = country_snapshot.get()
+
+        # A refresh in another process bumps the version without this process's signals
+        SystemStatus.objects.filter(pk=1).update(data_version=F('data_version') + 1)
+        self.client.get(url + '?region=Africa')
+
+        snapshot = country_snapshot.get()
+        self.assertIsNot(snapshot, old)
+        self.assertIn(CountrySnapshot.normalize({'sort': 'gdp_desc'}), snapshot.rendered)
+
+
+class CountryPaginationTest(APITestCase):
+    def setUp(self):
+        for name, region, population, gdp in [
+            ('Nigeria', 'Africa', 206139589, '1000000.00'),
+            ('Ghana', 'Africa', 31072940, '5000000.00'),
+            ('Kenya', 'Africa', 53771296, None),
+            ('Togo', 'Africa', 8000000, '5000000.00'),
+            ('France', 'Europe', 67391582, None),
+            ('Germany', 'Europe', 83240525, '9000000.00'),
+            ('Malta', 'Europe', 8000000, '1000000.00'),
+        ]:
+            Country.objects.create(name=name, region=region, population=population)
+            # save() derives GDP with a random multiplier, so set it directly
+            Country.objects.filter(name=name).update(estimated_gdp=gdp and Decimal(gdp))
+
+    def pages(self, query):
+        """Follow next links from the first page, returning each page's names"""
+        url = reverse('country-list') + query
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([c['name'] for c in response.data['results']])
+            url = response.data['next']
+        return pages
+
+    def test_pages_match_unpaginated_list_for_every_sort(self):
+        """Test that paging through ties and NULLs returns every row once, in order"""
+        for sort in ['', 'name_asc', 'name_desc', 'gdp_asc', 'gdp_desc', 'population_asc', 'population_desc', 'bogus']:
+            with self.subTest(sort=sort):
+                query = f'?sort={sort}' if sort else ''
+                expected = [c['name'] for c in self.client.get(reverse('country-list') + query).data]
+                pages = self.pages(query + ('&' if query else '?') + 'limit=2')
+                self.assertEqual(sum(pages, []), expected)
+                self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+    def test_pages_keep_filters_and_fields(self):
+        pages = self.pages('?region=europe&sort=gdp_desc&fields=name,estimated_gdp&limit=2')
+        self.assertEqual(pages, [['Germany', 'Malta'], ['France']])
+        response = self.client.get(reverse('country-list') + '?region=europe&fields=name&limit=5')
+        self.assertEqual(list(response.data['results'][0]), ['name'])
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_limit_and_cursor(self):
+        url = reverse('country-list')
+        self.assertEqual(self.client.get(url + '?limit=0').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url + '?cursor=not-a-cursor').status_code, status.HTTP_400_BAD_REQUEST)
+
+        next_url = self.client.get(url + '?sort=gdp_asc&limit=2').data['next']
+        response = self.client.get(next_url.replace('gdp_asc', 'name_desc'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+    def test_ndjson_stream(self):
+        """Test that NDJSON streams one country per line, selected by Accept or ?format="""
+        response = self.client.get(reverse('country-list') + '?sort=gdp_desc&fields=name', HTTP_ACCEPT='application/x-ndjson')
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{'name': name} for name in ['Germany', 'Ghana', 'Togo', 'Malta', 'Nigeria', 'France', 'Kenya']],
+        )
+
+    def test_ndjson_stream_reads_in_keyset_chunks(self):
+        """Test that streaming fetches bounded chunks instead of one result set"""
+        url = reverse('country-list') + '?format=ndjson&sort=gdp_asc&fields=name'
+        expected = [c['name'] for c in self.client.get(reverse('country-list') + '?sort=gdp_asc').data]
+
+        with patch.object(CountryViewSet, 'STREAM_CHUNK_SIZE', 2):
+            response = self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual([json.loads(line)['name'] for line in lines], expected)
+        # Seven countries: chunks of 2, 2, 2 and 1
+        self.assertEqual(len(queries), 4)
+        self.assertTrue(all('LIMIT 2' in query['sql'] for query in queries))
+
+    def test_ndjson_stream_page(self):
+        response = self.client.get(reverse('country-list') + '?format=ndjson&sort=name_asc&limit=3')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['France', 'Germany', 'Ghana'])
+        self.assertIn('rel="next"', response['Link'])
+
+
+class RefreshJobViewTest(APITestCase):
+    REFRESH_RESULT = {
+        "total_processed": 2,
+        "created": 1,
+        "updated": 0,
+        "unchanged": 0,
+        "skipped": 1,
+        "rows_written": 1,
+        "up_to_date": False,
+    }
+
+    def post_refresh(self):
+        with patch.object(RefreshJobRunner, 'start') as start:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('country-refresh'))
+        return response, start
+
+    def test_refresh_returns_accepted_job(self):
+        """Test that refresh queues a job and returns its id"""
+        response, start = self.post_refresh()
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['data']['id']
+        self.assertEqual(response.data['data']['status'], RefreshJob.STATUS_PENDING)
+        self.assertEqual(
+            response['Location'],
+            'http://testserver' + reverse('country-refresh-status', kwargs={'job_id': job_id}),
+        )
+        start.assert_called_once_with(job_id)
+
+    def test_concurrent_refresh_returns_active_job(self):
+        """Test that a second refresh while one is active doesn't start another"""
+        first, _ = self.post_refresh()
+        second, start = self.post_refresh()
+
+        self.assertEqual(second.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.data['data']['id'], first.data['data']['id'])
+        self.assertEqual(second.data['message'], 'Refresh already in progress.')
+        start.assert_not_called()
+        self.assertEqual(RefreshJob.objects.count(), 1)
+
+    @patch('countries.utils.refresh_jobs.SummaryImageGenerator')
+    @patch('countries.utils.refresh_jobs.DataRefreshService.refresh_country_data')
+    def test_job_progress_and_counts(self, mock_refresh, mock_image):
+        """Test that a finished job reports its counts and frees the slot"""
+        def refresh(force=False, progress=None):
+            progress("processing", 1, 2)
+            return self.REFRESH_RESULT
+        mock_refresh.side_effect = refresh
+
+        response, _ = self.post_refresh()
+        job_id = response.data['data']['id']
+        with patch('countries.utils.refresh_jobs.connection'):
+            RefreshJobRunner.run(job_id)
+
+        url = reverse('country-refresh-status', kwargs={'job_id': job_id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], RefreshJob.STATUS_SUCCEEDED)
+        self.assertEqual(response.data['stage'], 'done')
+        self.assertEqual(response.data['processed'], 2)
+        self.assertEqual(response.data['result']['created'], 1)
+        self.assertEqual(response.data['result']['skipped'], 1)
+        mock_image.return_value.generate_image.assert_called_once()
+
+        # The next refresh starts a new job
+        response, _ = self.post_refresh()
+        self.assertNotEqual(response.data['data']['id'], job_id)
+
+    @patch('countries.utils.refresh_jobs.DataRefreshService.refresh_country_data')
+    def test_failed_job_records_error(self, mock_refresh):
+        """Test that upstream failures are reported on the job"""
+        mock_refresh.side_effect = ExternalAPIError("Could not fetch data from restcountries")
+
+        response, _ = self.post_refresh()
+        job_id = response.data['data']['id']
+        with patch('countries.utils.refresh_jobs.connection'):
+            RefreshJobRunner.run(job_id)
+
+        job = RefreshJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, RefreshJob.STATUS_FAILED)
+        self.assertIn('restcountries', job.error)
+        self.assertIsNone(job.active_key)
+
+    def test_unknown_job_returns_404(self):
+        """Test polling a job that doesn't exist"""
+        url = reverse('country-refresh-status', kwargs={'job_id': 999})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SummaryImageViewTest(APITestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        settings_override = override_settings(CACHE_DIR=self.cache_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        SummaryImageGenerator._current = None
+        self.addCleanup(setattr, SummaryImageGenerator, '_current', None)
+
+        Country.objects.create(name='Nigeria', population=206139589, exchange_rate=Decimal('1600'))
+        SystemStatus.get_current_status().update_status()
+
+    def test_image_is_rendered_once_and_revalidated(self):
+        """Test that repeat requests reuse the image and honour If-None-Match"""
+        url = reverse('country-image')
+        with patch.object(SummaryImageGenerator, 'render', wraps=SummaryImageGenerator().render) as render:
+            first = self.client.get(url)
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first['Content-Type'], 'image/png')
+        self.assertIn('max-age=', first['Cache-Control'])
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(render.call_count, 1)
+
+    def test_image_changes_when_inputs_change(self):
+        """Test that a refresh with new data produces a new image"""
+        url = reverse('country-image')
+        first = self.client.get(url)
+
+        Country.objects.create(name='Ghana', population=31072940, exchange_rate=Decimal('15'))
+        SystemStatus.get_current_status().update_status()
+
+        # The previous image is served while the new one renders in the background
+        stale = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(stale.status_code, status.HTTP_304_NOT_MODIFIED)
+        SummaryImageGenerator._render_thread.join(timeout=10)
+
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_stale_image_is_served_without_rechecking_inputs(self):
+        """Test that requests during a background render don't collect the inputs again"""
+        url = reverse('country-image')
+        self.client.get(url)
+        Country.objects.create(name='Ghana', population=31072940, exchange_rate=Decimal('15'))
+        SystemStatus.get_current_status().update_status()
+
+        release = threading.Event()
+        draw = SummaryImageGenerator().render
+
+        def slow_render(inputs):
+            release.wait(timeout=10)
+            return draw(inputs)
+
+        with patch.object(SummaryImageGenerator, 'render', side_effect=slow_render), \
+                patch.object(SummaryImageGenerator, 'collect_inputs',
+                             wraps=SummaryImageGenerator().collect_inputs) as collect:
+            first = self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                second = self.client.get(url)
+            release.set()
+            SummaryImageGenerator._render_thread.join(timeout=10)
+            third = self.client.get(url)
+
+        self.assertEqual(collect.call_count, 1)
+        self.assertLessEqual(len(queries), 1)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertNotEqual(third['ETag'], first['ETag'])
+
+    def test_image_drawn_by_another_process_is_reused(self):
+        """Test that an up-to-date image on disk isn't redrawn"""
+        SummaryImageGenerator().generate_image()
+        SummaryImageGenerator._current = None
+
+        with patch.object(SummaryImageGenerator, 'render') as render:
+            response = self.client.get(reverse('country-image'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        render.assert_not_called()
+
+    def test_image_is_streamed_from_disk(self):
+        """Test that the image is served as a file, not loaded into the response"""
+        response = self.client.get(reverse('country-image'))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'\x89PNG'))
+        self.assertEqual(int(response['Content-Length']), len(content))
+
+    def test_image_byte_ranges(self):
+        """Test single byte ranges, If-Range and unsatisfiable ranges"""
+        url = reverse('country-image')
+        full = b''.join(self.client.get(url).streaming_content)
+
+        partial = self.client.get(url, HTTP_RANGE='bytes=0-7')
+        self.assertEqual(partial.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(partial.content, full[:8])
+        self.assertEqual(partial['Content-Range'], f'bytes 0-7/{len(full)}')
+
+        suffix = self.client.get(url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(suffix.content, full[-4:])
+
+        stale = self.client.get(url, HTTP_RANGE='bytes=0-7', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(stale.status_code, status.HTTP_200_OK)
+
+        beyond = self.client.get(url, HTTP_RANGE=f'bytes={len(full)}-')
+        self.assertEqual(beyond.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    def test_concurrent_first_requests_render_once(self):
+        """Test that simultaneous renders of the same data draw the image once"""
+        generator = SummaryImageGenerator()
+        inputs = generator.collect_inputs()
+        render = generator._render_for(inputs)
+        started = threading.Barrier(4)
+
+        def render_once():
+            started.wait()
+            # Bypasses the in-process lock, so only the file lock serializes them
+            SummaryImageGenerator()._render_once(inputs, render)
+
+        with patch.object(SummaryImageGenerator, 'render', wraps=generator.render) as draw:
+            threads = [threading.Thread(target=render_once) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(draw.call_count, 1)
+        self.assertTrue(os.path.isdir(render.directory))
+        self.assertEqual(
+            [name for name in os.listdir(generator.renders_dir) if name.startswith('.render-')], []
+        )
+
+    def test_image_sizes_and_formats(self):
+        """Test that size and Accept pick the variant, all drawn in one pass"""
+        url = reverse('country-image')
+        with patch.object(SummaryImageGenerator, 'render', wraps=SummaryImageGenerator().render) as render:
+            webp = self.client.get(url + '?size=thumb', HTTP_ACCEPT='image/webp,image/*;q=0.8')
+            png = self.client.get(url + '?size=medium', HTTP_ACCEPT='image/*')
+        self.assertEqual(render.call_count, 1)
+
+        self.assertEqual(webp.status_code, status.HTTP_200_OK)
+        self.assertEqual(webp['Content-Type'], 'image/webp')
+        self.assertIn('Accept', webp['Vary'])
+        with Image.open(io.BytesIO(b''.join(webp.streaming_content))) as thumb:
+            self.assertEqual((thumb.format, thumb.size), ('WEBP', (200, 150)))
+        with Image.open(io.BytesIO(b''.join(png.streaming_content))) as medium:
+            self.assertEqual((medium.format, medium.size), ('PNG', (400, 300)))
+        self.assertNotEqual(webp['ETag'], png['ETag'])
+
+    def test_invalid_image_size(self):
+        """Test that unknown sizes are rejected"""
+        response = self.client.get(reverse('country-image') + '?size=huge')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_format_negotiation(self):
+        """Test Accept header negotiation"""
+        self.assertEqual(negotiate_format(None), 'png')
+        self.assertEqual(negotiate_format('*/*'), 'png')
+        self.assertEqual(negotiate_format('image/webp,*/*'), 'webp')
+        self.assertEqual(negotiate_format('image/webp;q=0.5,image/png'), 'png')
+        self.assertEqual(negotiate_format('image/png;q=0.5,image/webp;q=0.5'), 'webp')
+
+    def test_image_can_be_published_to_media_root(self):
+        """Test that the image can be written where a front proxy serves it"""
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root, SUMMARY_IMAGE_LOCATION='media'):
+            response = self.client.get(reverse('country-image'))
+            b''.join(response.streaming_content)
+            response.close()
+
+            path = os.path.join(media_root, 'summary.png')
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+
+
+class CountryAggregatesViewTest(APITestCase):
+    def setUp(self):
+        for name, region, currency, population, gdp in [
+            ('Nigeria', 'Africa', 'NGN', 100000000, '1000000.00'),
+            ('Ghana', 'Africa', 'GHS', 50000000, '5000000.00'),
+            ('Togo', 'Africa', 'XOF', 8000000, None),
+            ('Senegal', 'Africa', 'XOF', 17000000, '2000000.00'),
+            ('Nowhere', None, None, 10, None),
+        ]:
+            Country.objects.create(name=name, region=region, currency_code=currency, population=population)
+            # save() derives GDP with a random multiplier, so set it directly
+            Country.objects.filter(name=name).update(estimated_gdp=gdp and Decimal(gdp))
+        AggregateBuilder.rebuild()
+
+    def test_group_by_region(self):
+        """Test per-region totals, with countries without a region in their own group"""
+        response = self.client.get(reverse('country-aggregates'), {'group_by': 'region'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        africa = next(row for row in response.data if row['region'] == 'Africa')
+        self.assertEqual(africa['country_count'], 4)
+        self.assertEqual(africa['total_population'], 175000000)
+        self.assertEqual(Decimal(africa['total_gdp']), Decimal('8000000.00'))
+        # Countries without a GDP don't count towards the average
+        self.assertEqual(Decimal(africa['average_gdp']), Decimal('2666666.67'))
+        self.assertEqual(africa['currency_count'], 3)
+        self.assertIn(None, [row['region'] for row in response.data])
+
+    def test_group_by_currency_single_row(self):
+        """Test that naming a currency returns just its row, from one query"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('country-aggregates'), {'group_by': 'currency', 'currency': 'xof'})
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['currency_code'], 'XOF')
+        self.assertEqual(response.data[0]['country_count'], 2)
+        self.assertEqual(response.data[0]['total_population'], 25000000)
+
+    def test_invalid_group_by(self):
+        response = self.client.get(reverse('country-aggregates'), {'group_by': 'capital'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+    def test_delete_updates_aggregates(self):
+        self.client.delete(reverse('country-detail', kwargs={'name': 'Ghana'}))
+        self.assertEqual(RegionAggregate.objects.get(region='Africa').country_count, 3)
+
+
+class RateHistoryViewTest(APITestCase):
+    START = 1704067200  # 2024-01-01T00:00:00Z
+
+    def setUp(self):
+        Country.objects.create(name='Nigeria', population=100000000, currency_code='NGN')
+        Country.objects.create(name='Nowhere', population=10)
+        RateHistoryStore.record({
+            'NGN': [(self.START + day * 86400, 1500.0 + day) for day in range(60)],
+            'GHS': [(self.START, 15.0)],
+        })
+
+    def test_rates_in_range(self):
+        """Test that from/to dates select whole days and only the country's currency"""
+        url = reverse('country-rates', kwargs={'name': 'nigeria'})
+        response = self.client.get(url, {'from': '2024-01-30', 'to': '2024-02-02'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['currency_code'], 'NGN')
+        self.assertEqual([sample['rate'] for sample in response.data['rates']], [1529.0, 1530.0, 1531.0, 1532.0])
+        body = json.loads(response.content)
+        self.assertEqual(body['rates'][0]['timestamp'], '2024-01-30T00:00:00Z')
+
+    def test_rates_without_currency_or_history(self):
+        url = reverse('country-rates', kwargs={'name': 'Nowhere'})
+        response = self.client.get(url, {'from': '2024-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rates'], [])
+
+    def test_invalid_range(self):
+        url = reverse('country-rates', kwargs={'name': 'Nigeria'})
+        self.assertEqual(self.client.get(url, {'from': 'yesterday'}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'from': '2024-02-01', 'to': '2024-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+    def test_unknown_country(self):
+        response = self.client.get(reverse('country-rates', kwargs={'name': 'Atlantis'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class StatusViewTest(APITestCase):
     def test_status_endpoint(self):
         """Test system status endpoint"""
@@ -124,4 +764,31 @@ class StatusViewTest(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['total_countries'], 2)
-        self.assertIn('last_refreshed_at', response.data)  # Critical test!
\ No newline at end of file
+        self.assertIn('last_refreshed_at', response.data)  # Critical test!
+
+    def test_status_is_served_without_queries(self):
+        """Test that repeated status requests reuse the cached response"""
+        Country.objects.create(name='Test1', population=1000000)
+        url = reverse('status-list')
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(json.loads(response.content)['total_countries'], 1)
+
+    def test_status_follows_refresh_and_delete(self):
+        """Test that refresh and delete update the cached count without recounting"""
+        for name in ('Test1', 'Test2', 'Test3'):
+            Country.objects.create(name=name, population=1000000)
+        url = reverse('status-list')
+        self.client.get(url)
+
+        SystemStatus.get_current_status().update_status(total_countries=3)
+        first = self.client.get(url).data
+        self.assertEqual(first['total_countries'], 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.delete(reverse('country-detail', kwargs={'name': 'Test1'}))
+        self.assertFalse(any('COUNT(*)' in query['sql'] for query in queries))
+        self.assertEqual(self.client.get(url).data['total_countries'], 2)
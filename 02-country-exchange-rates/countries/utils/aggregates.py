@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Avg, Count, Sum
+from django.utils import timezone
+
+
+class AggregateBuilder:
+    """
+    Rebuilds the region and currency rollup tables from the countries table,
+    so /countries/aggregates reads a few precomputed rows instead of
+    reducing the whole list per request.
+    """
+
+    CENTS = Decimal('0.01')
+    # group_by value: (rollup model, Country column it groups on)
+    GROUPS = {
+        'region': ('RegionAggregate', 'region'),
+        'currency': ('CurrencyAggregate', 'currency_code'),
+    }
+
+    @staticmethod
+    def _totals(country_model, column, **extra):
+        return (
+            country_model.objects.order_by()
+            .values(column)
+            .annotate(
+                country_count=Count('id'),
+                total_population=Sum('population'),
+                total_gdp=Sum('estimated_gdp'),
+                average_gdp=Avg('estimated_gdp'),
+                **extra,
+            )
+        )
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Replace every rollup row with totals computed by one GROUP BY query
+        per table.
+        """
+        country_model = apps.get_model('countries', 'Country')
+        built_at = timezone.now()
+
+        # Refreshes call this inside their own transaction; no savepoint needed there
+        with transaction.atomic(savepoint=False):
+            for group_by, (model_name, column) in cls.GROUPS.items():
+                model = apps.get_model('countries', model_name)
+                extra = {}
+                if group_by == 'region':
+                    extra['currency_count'] = Count('currency_code', distinct=True)
+
+                rows = []
+                for totals in cls._totals(country_model, column, **extra):
+                    totals['total_population'] = totals['total_population'] or 0
+                    if totals['average_gdp'] is not None:
+                        totals['average_gdp'] = Decimal(totals['average_gdp']).quantize(cls.CENTS)
+                    rows.append(model(**totals, updated_at=built_at))
+
+                model.objects.all().delete()
+                model.objects.bulk_create(rows)
@@ -1,7 +1,17 @@
 import requests
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 from typing import Dict, List
+from requests.adapters import HTTPAdapter
+from django.db import connection, transaction
 from django.utils import timezone
+from .aggregates import AggregateBuilder
+from .gdp import GDPCalculator
+from .rate_history import RateHistoryStore
+from .upstream_cache import FetchResult, UpstreamCache
 
 logger = logging.getLogger(__name__)
 
@@ -12,16 +22,32 @@ class ExternalAPIError(Exception):
     pass
 
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Shared HTTP session so upstream connections are pooled and kept alive."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
 class CountryDataFetcher:
     BASE_URL = "https://restcountries.com/v2/all"
+    PARAMS = {"fields": "name,capital,region,population,flags,currencies"}
+    cache = UpstreamCache("countries")
 
     @classmethod
     def fetch_all_countries(cls) -> List[Dict]:
         """Fetch data for all countries from the countries API."""
         try:
-            params = {"fields": "name,capital,region,population,flags,currencies"}
-
-            response = requests.get(cls.BASE_URL, params=params, timeout=30)
+            response = get_http_session().get(cls.BASE_URL, params=cls.PARAMS, timeout=30)
             response.raise_for_status()
 
             return response.json()
@@ -30,6 +56,33 @@ class CountryDataFetcher:
             logger.error(f"Failed to fetch country data: {str(e)}")
             raise ExternalAPIError("Could not fetch data from countries API")
 
+    @classmethod
+    def fetch_all_countries_if_changed(cls, force=False) -> FetchResult:
+        """
+        Conditional fetch against the last applied response. A 304 (or an
+        identical body) is reported as unchanged and served from the disk copy.
+        """
+        cached = None if force else cls.cache.load()
+        try:
+            response = get_http_session().get(
+                cls.BASE_URL,
+                params=cls.PARAMS,
+                headers=UpstreamCache.conditional_headers(cached),
+                timeout=30,
+            )
+            if response.status_code == 304 and cached:
+                return FetchResult(cached["body"], changed=False)
+            response.raise_for_status()
+
+            data = response.json()
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to fetch country data: {str(e)}")
+            raise ExternalAPIError("Could not fetch data from countries API")
+
+        changed = cached is None or data != cached["body"]
+        return FetchResult(data, changed, UpstreamCache.make_entry(data, response))
+
     @classmethod
     def parse_country_data(cls, country_data: Dict) -> Dict:
         """Parse relevant fields from country data."""
@@ -55,12 +108,13 @@ class CountryDataFetcher:
 
 class ExchangeRateFetcher:
     BASE_URL = "https://open.er-api.com/v6/latest/USD"
+    cache = UpstreamCache("exchange_rates")
 
     @classmethod
     def fetch_exchange_rate(cls) -> Dict[str, float]:
         """Fetch exchange rates from ER API"""
         try:
-            response = requests.get(cls.BASE_URL, timeout=30)
+            response = get_http_session().get(cls.BASE_URL, timeout=30)
             response.raise_for_status()
 
             data = response.json()
@@ -74,23 +128,208 @@ class ExchangeRateFetcher:
             logging.error(f"Failed to fetch exchange rates: {str(e)}")
             raise ExternalAPIError("Could not fetch data from exchange rate API")
 
+    @classmethod
+    def fetch_exchange_rate_if_changed(cls, force=False) -> FetchResult:
+        """
+        Skip the request while the rates published with the last applied
+        response are still current (time_next_update_unix), otherwise send
+        a conditional request.
+        """
+        cached = None if force else cls.cache.load()
+        if cached and time.time() < (cached["meta"].get("time_next_update_unix") or 0):
+            return FetchResult(cached["body"], changed=False)
+
+        try:
+            response = get_http_session().get(
+                cls.BASE_URL,
+                headers=UpstreamCache.conditional_headers(cached),
+                timeout=30,
+            )
+            if response.status_code == 304 and cached:
+                return FetchResult(cached["body"], changed=False)
+            response.raise_for_status()
+
+            data = response.json()
+
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Failed to fetch exchange rates: {str(e)}")
+            raise ExternalAPIError("Could not fetch data from exchange rate API")
+
+        if data.get("result") != "success":
+            raise ExternalAPIError("Exchange rate API returned error")
+
+        rates = data.get("rates", {})
+        changed = cached is None or rates != cached["body"]
+        entry = UpstreamCache.make_entry(
+            rates,
+            response,
+            time_last_update_unix=data.get("time_last_update_unix"),
+            time_next_update_unix=data.get("time_next_update_unix"),
+        )
+        return FetchResult(rates, changed, entry)
+
 
 class DataRefreshService:
+    # Columns rewritten for countries that already exist
+    UPDATE_FIELDS = [
+        "capital",
+        "region",
+        "population",
+        "currency_code",
+        "exchange_rate",
+        "estimated_gdp",
+        "flag_url",
+        "source_hash",
+        "gdp_multiplier",
+        "last_refreshed_at",
+    ]
+    # Columns written by a rates-only refresh
+    RATE_UPDATE_FIELDS = ["exchange_rate", "estimated_gdp"]
+    BATCH_SIZE = 100
+    PROGRESS_EVERY = 50
+    # Exchange rates are stored with 6 decimal places
+    RATE_QUANTUM = Decimal("0.000001")
+
+    @staticmethod
+    def _oversized_fields(country):
+        """Return the names of text fields whose value exceeds the column size."""
+        return [
+            field.name
+            for field in country._meta.concrete_fields
+            if field.max_length
+            and getattr(country, field.attname) is not None
+            and len(getattr(country, field.attname)) > field.max_length
+        ]
+
+    @staticmethod
+    def _upsert(model, countries):
+        """
+        Write new and changed countries in batched upserts
+        (INSERT ... ON DUPLICATE KEY UPDATE on MySQL, ON CONFLICT elsewhere).
+        Rows conflict on name_key, so existing countries keep their stored name.
+        """
+        options = {}
+        if connection.features.supports_update_conflicts_with_target:
+            options["unique_fields"] = ["name_key"]
+        model.objects.bulk_create(
+            countries,
+            batch_size=DataRefreshService.BATCH_SIZE,
+            update_conflicts=True,
+            update_fields=DataRefreshService.UPDATE_FIELDS,
+            **options,
+        )
+
+    @staticmethod
+    def _timed(fetch):
+        started = time.perf_counter()
+        data = fetch()
+        return data, round((time.perf_counter() - started) * 1000, 1)
+
+    @staticmethod
+    def fetch_sources(force=False):
+        """
+        Fetch countries and exchange rates concurrently, so the refresh waits
+        for the slower upstream rather than the sum of both.
+        Returns (countries FetchResult, exchange rates FetchResult, timings in milliseconds).
+        """
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="refresh-fetch") as executor:
+            countries_future = executor.submit(
+                DataRefreshService._timed,
+                lambda: CountryDataFetcher.fetch_all_countries_if_changed(force),
+            )
+            rates_future = executor.submit(
+                DataRefreshService._timed,
+                lambda: ExchangeRateFetcher.fetch_exchange_rate_if_changed(force),
+            )
+            countries_result, countries_ms = countries_future.result()
+            rates_result, rates_ms = rates_future.result()
+
+        timings = {
+            "countries_ms": countries_ms,
+            "exchange_rates_ms": rates_ms,
+            "fetch_total_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        logger.info(f"Fetched refresh sources: {timings}")
+        return countries_result, rates_result, timings
+
+    @staticmethod
+    def _record_rate_history(rates_result, fallback_time):
+        """
+        Append the fetched rates to the per-currency history, timestamped
+        with the upstream's own update time when it reports one.
+        """
+        if not rates_result.changed:
+            return 0
+        meta = (rates_result.cache_entry or {}).get("meta", {})
+        observed_at = meta.get("time_last_update_unix") or int(fallback_time.timestamp())
+        return RateHistoryStore.record_rates(rates_result.data, observed_at)
+
+    @staticmethod
+    def _save_upstream_caches(countries_result=None, rates_result=None):
+        """Remember the responses that are now reflected in the database."""
+        for fetcher, result in (
+            (CountryDataFetcher, countries_result),
+            (ExchangeRateFetcher, rates_result),
+        ):
+            if result is not None and result.cache_entry is not None:
+                try:
+                    fetcher.cache.save(result.cache_entry)
+                except OSError as e:
+                    logger.warning(f"Could not persist upstream cache: {str(e)}")
+
     @staticmethod
-    def refresh_country_data():
-        """Main service method to refresh country data."""
+    def refresh_country_data(force=False, seed=None, progress=None):
+        """
+        Main service method to refresh country data.
+        Unless forced, nothing is parsed or written when neither upstream changed,
+        and only countries whose upstream fields or rate changed are rewritten.
+        New countries draw their GDP multiplier from a per-refresh seed.
+        progress, if given, is called as progress(stage, processed, total).
+        """
         from ..models import Country, SystemStatus
 
+        report = progress or (lambda stage, processed, total: None)
+
         try:
             # Fetch data from external APIs
-            countries_data = CountryDataFetcher.fetch_all_countries()
-            exchange_rates = ExchangeRateFetcher.fetch_exchange_rate()
+            report("fetching", 0, 0)
+            countries_result, rates_result, timings = DataRefreshService.fetch_sources(force)
+
+            if not (countries_result.changed or rates_result.changed) and Country.objects.exists():
+                DataRefreshService._save_upstream_caches(countries_result, rates_result)
+                return {
+                    "total_processed": 0,
+                    "created": 0,
+                    "updated": 0,
+                    "unchanged": 0,
+                    "skipped": 0,
+                    "rows_written": 0,
+                    "up_to_date": True,
+                    "timings": timings,
+                }
+
+            countries_data = countries_result.data
+            exchange_rates = rates_result.data
+
+            # Load existing countries once, keyed by normalized name
+            existing = {country.name_key: country for country in Country.objects.all()}
+            to_create = {}
+            to_update = {}
 
             updated_countries = 0
             created_countries = 0
+            unchanged_countries = 0
             skipped_countries = 0
+            refreshed_at = timezone.now()
+            if seed is None:
+                seed = int(refreshed_at.timestamp())
+
+            report("processing", 0, len(countries_data))
+            for index, country_data in enumerate(countries_data):
+                if index and index % DataRefreshService.PROGRESS_EVERY == 0:
+                    report("processing", index, len(countries_data))
 
-            for country_data in countries_data:
                 parsed_data = CountryDataFetcher.parse_country_data(country_data)
 
                 if not parsed_data["name"] or parsed_data["population"] is None:
@@ -101,8 +340,23 @@ class DataRefreshService:
                 exchange_rate = exchange_rates.get(currency_code) if currency_code else None
 
                 if exchange_rate is not None:
-                    from decimal import Decimal
-                    exchange_rate = Decimal(str(exchange_rate))
+                    exchange_rate = Decimal(str(exchange_rate)).quantize(DataRefreshService.RATE_QUANTUM)
+
+                key = Country.normalize_name(parsed_data["name"])
+                country = existing.get(key) or to_create.get(key)
+                created = country is None
+                source_hash = Country.compute_source_hash(parsed_data)
+
+                if (
+                    not created
+                    and country.source_hash == source_hash
+                    and country.exchange_rate == exchange_rate
+                ):
+                    unchanged_countries += 1
+                    continue
+
+                if created:
+                    country = Country(name=parsed_data["name"], name_key=key)
 
                 country_dict = {
                     "capital": parsed_data["capital"],
@@ -111,33 +365,57 @@ class DataRefreshService:
                     "currency_code": currency_code,
                     "exchange_rate": exchange_rate,
                     "flag_url": parsed_data["flag_url"],
-                    "last_refreshed_at": timezone.now(),
+                    "source_hash": source_hash,
+                    "last_refreshed_at": refreshed_at,
                 }
 
-                try:
-                    country, created = Country.objects.update_or_create(
-                        name__iexact=parsed_data["name"], 
-                        defaults=country_dict
-                    )
+                for field, value in country_dict.items():
+                    setattr(country, field, value)
 
-                    if created:
-                        created_countries += 1
-                    else:
-                        updated_countries += 1
-                except Exception as e:
-                    logger.error(f"Error processing country {parsed_data['name']}: {str(e)}")
+                # A single bad row would abort the whole bulk write, so check it up front
+                too_long = DataRefreshService._oversized_fields(country)
+                if too_long:
+                    logger.error(
+                        f"Error processing country {parsed_data['name']}: "
+                        f"value too long for {', '.join(too_long)}"
+                    )
                     skipped_countries += 1
                     continue
 
-            # Update system status
-            system_status = SystemStatus.get_current_status()
-            system_status.update_status()
+                if created:
+                    to_create[key] = country
+                    created_countries += 1
+                else:
+                    if country.pk:
+                        to_update[key] = country
+                    updated_countries += 1
+
+            rows = [*to_create.values(), *to_update.values()]
+            # bulk writes bypass Country.save(), so derive GDP here, for all rows at once
+            GDPCalculator.assign(rows, seed)
+            report("writing", len(countries_data), len(countries_data))
+            with transaction.atomic():
+                DataRefreshService._upsert(Country, rows)
+                AggregateBuilder.rebuild()
+                DataRefreshService._record_rate_history(rates_result, refreshed_at)
+
+                # Update system status
+                # Every stored country was loaded above, so the count is known
+                system_status = SystemStatus.get_current_status()
+                system_status.update_status(total_countries=len(existing) + created_countries)
+
+            DataRefreshService._save_upstream_caches(countries_result, rates_result)
 
             return {
                 "total_processed": len(countries_data),
                 "created": created_countries,
                 "updated": updated_countries,
+                "unchanged": unchanged_countries,
                 "skipped": skipped_countries,
+                "rows_written": len(rows),
+                "gdp_seed": seed,
+                "up_to_date": False,
+                "timings": timings,
             }
 
         except ExternalAPIError as e:
@@ -145,4 +423,90 @@ class DataRefreshService:
             raise
         except Exception as e:
             logger.error(f"Unexpected error during refresh: {str(e)}")
-            raise ExternalAPIError(f"Refresh failed: {str(e)}")
\ No newline at end of file
+            raise ExternalAPIError(f"Refresh failed: {str(e)}")
+
+    @staticmethod
+    def refresh_exchange_rates(force=False, seed=None):
+        """
+        Rates-only refresh: apply the latest exchange rates to the stored
+        countries without fetching country metadata. Only exchange_rate and
+        estimated_gdp are written, in bulk, for countries whose rate changed.
+        """
+        from ..models import Country, SystemStatus
+
+        try:
+            started = time.perf_counter()
+            rates_result = ExchangeRateFetcher.fetch_exchange_rate_if_changed(force)
+            timings = {"exchange_rates_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+            if not rates_result.changed:
+                DataRefreshService._save_upstream_caches(rates_result=rates_result)
+                return {
+                    "total_processed": 0,
+                    "updated": 0,
+                    "unchanged": 0,
+                    "rows_written": 0,
+                    "up_to_date": True,
+                    "timings": timings,
+                }
+
+            exchange_rates = rates_result.data
+            if seed is None:
+                seed = int(timezone.now().timestamp())
+
+            countries = Country.objects.only(
+                "id", "name", "name_key", "population", "currency_code", "exchange_rate", "gdp_multiplier"
+            )
+            changed = []
+            unchanged_countries = 0
+            update_fields = list(DataRefreshService.RATE_UPDATE_FIELDS)
+
+            for country in countries:
+                exchange_rate = exchange_rates.get(country.currency_code) if country.currency_code else None
+                if exchange_rate is not None:
+                    exchange_rate = Decimal(str(exchange_rate)).quantize(DataRefreshService.RATE_QUANTUM)
+
+                if country.exchange_rate == exchange_rate:
+                    unchanged_countries += 1
+                    continue
+
+                country.exchange_rate = exchange_rate
+                changed.append(country)
+
+            # A country that had no rate before gets its multiplier now
+            had_multiplier = [country.gdp_multiplier is not None for country in changed]
+            GDPCalculator.assign(changed, seed)
+            if any(
+                not had and country.gdp_multiplier is not None
+                for had, country in zip(had_multiplier, changed)
+            ):
+                update_fields.append("gdp_multiplier")
+
+            with transaction.atomic():
+                Country.objects.bulk_update(
+                    changed, update_fields, batch_size=DataRefreshService.BATCH_SIZE
+                )
+                AggregateBuilder.rebuild()
+                DataRefreshService._record_rate_history(rates_result, timezone.now())
+                SystemStatus.get_current_status().update_status(
+                    total_countries=len(changed) + unchanged_countries
+                )
+
+            DataRefreshService._save_upstream_caches(rates_result=rates_result)
+
+            return {
+                "total_processed": len(changed) + unchanged_countries,
+                "updated": len(changed),
+                "unchanged": unchanged_countries,
+                "rows_written": len(changed),
+                "gdp_seed": seed,
+                "up_to_date": False,
+                "timings": timings,
+            }
+
+        except ExternalAPIError as e:
+            logger.error(f"Exchange rate refresh failed: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error during exchange rate refresh: {str(e)}")
+            raise ExternalAPIError(f"Exchange rate refresh failed: {str(e)}")
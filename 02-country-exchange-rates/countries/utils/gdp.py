@@ -0,0 +1,66 @@
+import logging
+import random
+
+try:
+    import numpy as np
+except ImportError:  # Without NumPy (see requirements.txt) GDP is computed row by row
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class GDPCalculator:
+    """
+    Computes estimated_gdp for a whole batch of countries at once:
+    population * gdp_multiplier / exchange_rate, rounded to 2 decimals.
+    Countries without a population or a (non-zero) exchange rate get None.
+    """
+
+    MULTIPLIER_RANGE = (1000, 2000)
+    # Whether the row by row fallback has been reported in this process
+    _fallback_logged = False
+
+    @staticmethod
+    def draw_missing_multipliers(countries, seed):
+        """
+        Give each country that can have a GDP but has no multiplier yet one
+        drawn from its own seeded generator, so a country's draw doesn't
+        depend on which other countries are in the batch.
+        """
+        for country in countries:
+            if country.gdp_multiplier is None and country.population and country.exchange_rate:
+                rng = random.Random(f"{seed}:{country.name_key}")
+                country.gdp_multiplier = rng.uniform(*GDPCalculator.MULTIPLIER_RANGE)
+
+    @classmethod
+    def assign(cls, countries, seed):
+        """Set estimated_gdp (and any missing multiplier) on every country in countries."""
+        countries = list(countries)
+        cls.draw_missing_multipliers(countries, seed)
+        if not countries:
+            return
+
+        if np is None:
+            if not GDPCalculator._fallback_logged:
+                GDPCalculator._fallback_logged = True
+                logger.warning("NumPy is not installed; computing estimated GDP row by row")
+            for country in countries:
+                country.estimated_gdp = country.calculate_estimated_gdp()
+            return
+
+        count = len(countries)
+        population = np.fromiter((c.population or 0 for c in countries), dtype=np.float64, count=count)
+        rate = np.fromiter((c.exchange_rate or 0 for c in countries), dtype=np.float64, count=count)
+        multiplier = np.fromiter(
+            (np.nan if c.gdp_multiplier is None else c.gdp_multiplier for c in countries),
+            dtype=np.float64,
+            count=count,
+        )
+
+        valid = (population > 0) & (rate > 0) & ~np.isnan(multiplier)
+        gdp = np.zeros(count)
+        np.divide(population * multiplier, rate, out=gdp, where=valid)
+        gdp = np.round(gdp, 2)
+
+        for country, is_valid, value in zip(countries, valid.tolist(), gdp.tolist()):
+            country.estimated_gdp = value if is_valid else None
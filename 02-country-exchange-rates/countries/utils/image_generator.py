@@ -1,72 +1,346 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, features
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple, Optional
+import hashlib
+import json
+import logging
 import os
+import shutil
+import tempfile
+import threading
+import time
 from django.conf import settings
-from django.http import HttpResponse
 from ..models import Country, SystemStatus
+from .locks import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryRender(NamedTuple):
+    """All variants of the summary image drawn from one set of inputs"""
+    fingerprint: str
+    last_modified: datetime
+    directory: str
+
+
+class SummaryImage(NamedTuple):
+    etag: str
+    last_modified: datetime
+    path: str
+    content_type: str
+
+
+@lru_cache(maxsize=None)
+def load_fonts():
+    """Load the title, header and body fonts once per process"""
+    try:
+        return (
+            ImageFont.truetype("arial.ttf", 32),
+            ImageFont.truetype("arial.ttf", 24),
+            ImageFont.truetype("arial.ttf", 18),
+        )
+    except OSError:
+        # Use default font if arial isn't installed
+        default = ImageFont.load_default()
+        return default, default, default
+
+
+@lru_cache(maxsize=None)
+def available_formats():
+    """Output formats this Pillow build can encode, most preferred first"""
+    return [
+        name for name in SummaryImageGenerator.FORMAT_PREFERENCE
+        if name == 'png' or features.check(name)
+    ]
+
+
+def negotiate_format(accept):
+    """
+    Pick the output format for an Accept header. AVIF and WebP are only
+    chosen when asked for explicitly; PNG also matches image/* and */*.
+    Ties in quality go to the smaller format.
+    """
+    quality = {}
+    for media_range in (accept or '').split(','):
+        media_type, *params = [part.strip() for part in media_range.split(';')]
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        quality[media_type.lower()] = q
+
+    best, best_q = 'png', 0.0
+    for name in available_formats():
+        content_type = SummaryImageGenerator.FORMATS[name][1]
+        if content_type in quality:
+            q = quality[content_type]
+        elif name == 'png':
+            q = quality.get('image/*', quality.get('*/*', 0.0))
+        else:
+            continue
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
 
 class SummaryImageGenerator:
+    """
+    Renders the summary image only when its inputs (total, top 5 by GDP and
+    refresh time) change. One draw pass produces every size and format,
+    written together to a directory named after a fingerprint of the inputs;
+    the fingerprint also makes up the ETags. Each process remembers which
+    render is current so requests don't re-check the data.
+    """
+
+    SIZES = {
+        'full': (800, 600),
+        'medium': (400, 300),
+        'thumb': (200, 150),
+    }
+    # name: (Pillow format, content type, encoder options)
+    FORMATS = {
+        'png': ('PNG', 'image/png', {'optimize': True}),
+        'webp': ('WEBP', 'image/webp', {'quality': 90}),
+        'avif': ('AVIF', 'image/avif', {'quality': 70}),
+    }
+    FORMAT_PREFERENCE = ['avif', 'webp', 'png']
+
+    # Current render shared by every generator in this process, with the
+    # data version it was checked against
+    _current = None
+    # (data version, render) being drawn in the background, if any, and its thread
+    _pending = None
+    _render_thread = None
+    _lock = threading.Lock()
+    # Seconds to wait for another process's render before rendering anyway
+    RENDER_LOCK_TIMEOUT = 30
+    STALE_RENDER_AGE = 600
+
+    # Where SUMMARY_IMAGE_LOCATION puts the image; static and media let a
+    # front proxy serve it from STATIC_URL / MEDIA_URL without Django
+    LOCATIONS = {
+        'cache': lambda: settings.CACHE_DIR,
+        'static': lambda: settings.STATIC_ROOT,
+        'media': lambda: settings.MEDIA_ROOT,
+    }
+
     def __init__(self):
-        self.image_path = os.path.join(settings.BASE_DIR, 'cache', 'summary.png')
+        directory = self.LOCATIONS[settings.SUMMARY_IMAGE_LOCATION]()
+        # Full size PNG at a stable path, for proxies and older clients
+        self.image_path = os.path.join(directory, 'summary.png')
+        self.renders_dir = os.path.join(directory, 'summary')
         # Ensure cache directory exists
-        os.makedirs(os.path.dirname(self.image_path), exist_ok=True)
-    
+        os.makedirs(self.renders_dir, exist_ok=True)
+
+    @staticmethod
+    def _data_version():
+        return SystemStatus.objects.filter(pk=1).values_list('data_version', 'last_refreshed_at').first()
+
+    def collect_inputs(self):
+        """Everything the image shows"""
+        status = SystemStatus.get_current_status()
+        top_countries = Country.objects.exclude(
+            estimated_gdp__isnull=True
+        ).order_by('-estimated_gdp').values_list('name', 'estimated_gdp')[:5]
+        return {
+            'total_countries': Country.objects.count(),
+            'top_countries': list(top_countries),
+            'last_refreshed_at': status.last_refreshed_at,
+        }
+
+    @staticmethod
+    def fingerprint(inputs):
+        payload = json.dumps(inputs, default=str, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    def render(self, inputs):
+        """Draw the summary image"""
+        title_font, header_font, body_font = load_fonts()
+
+        # Create image with white background
+        image = Image.new('RGB', self.SIZES['full'], 'white')
+        draw = ImageDraw.Draw(image)
+
+        # Draw content
+        draw.text((50, 50), "Country GDP Summary", fill='black', font=title_font)
+        draw.text((50, 100), f"Total Countries: {inputs['total_countries']}", fill='black', font=header_font)
+        draw.text((50, 130), f"Last Refresh: {inputs['last_refreshed_at']}", fill='black', font=header_font)
+        draw.text((50, 180), "Top 5 Countries by GDP:", fill='black', font=header_font)
+
+        y = 220
+        for i, (name, estimated_gdp) in enumerate(inputs['top_countries'], 1):
+            gdp = f"${estimated_gdp:,.2f}" if estimated_gdp else "N/A"
+            draw.text((70, y), f"{i}. {name}: {gdp}", fill='black', font=body_font)
+            y += 30
+
+        return image
+
+    def get_render(self, wait=True) -> Optional[SummaryRender]:
+        """
+        Return the current render, drawing it only if the data it shows
+        changed. Costs one query while the data version is unchanged.
+        With wait=False, a render that is out of date is redrawn in a
+        background thread and the previous one is returned meanwhile,
+        also with one query while that render is in flight.
+        """
+        try:
+            version = self._data_version()
+            current = SummaryImageGenerator._current
+            if (
+                current
+                and version is not None
+                and current[0] == version
+                and os.path.isdir(current[1].directory)
+            ):
+                return current[1]
+
+            pending = SummaryImageGenerator._pending
+            if (
+                not wait
+                and pending
+                and version is not None
+                and pending[0] == version
+                and current
+                and os.path.isdir(current[1].directory)
+            ):
+                return current[1]
+
+            with SummaryImageGenerator._lock:
+                inputs = self.collect_inputs()
+                render = self._render_for(inputs)
+
+                if not os.path.isdir(render.directory):
+                    previous = SummaryImageGenerator._current
+                    if not wait and previous and os.path.isdir(previous[1].directory):
+                        self._render_in_background(version, inputs, render)
+                        return previous[1]
+                    self._render_once(inputs, render)
+
+                SummaryImageGenerator._current = (version, render)
+                return render
+
+        except Exception as e:
+            logger.error(f"Error generating image: {str(e)}")
+            return None
+
+    def get_image(self, size='full', image_format='png', wait=True) -> Optional[SummaryImage]:
+        render = self.get_render(wait=wait)
+        if render is None:
+            return None
+        return SummaryImage(
+            etag=f"{render.fingerprint}-{size}-{image_format}",
+            last_modified=render.last_modified,
+            path=os.path.join(render.directory, f"{size}.{image_format}"),
+            content_type=self.FORMATS[image_format][1],
+        )
+
     def generate_image(self):
-        """Generate summary image with country data"""
+        """Bring every variant of the summary image up to date with the current data"""
+        return self.get_render() is not None
+
+    def _render_for(self, inputs):
+        fingerprint = self.fingerprint(inputs)
+        return SummaryRender(
+            fingerprint, inputs['last_refreshed_at'], os.path.join(self.renders_dir, fingerprint)
+        )
+
+    def _render_in_background(self, version, inputs, render):
+        """ Called with _lock held """
+        pending = SummaryImageGenerator._pending
+        if pending and pending[1].fingerprint == render.fingerprint:
+            # Same image, newer version stamp: let requests for it skip the inputs
+            SummaryImageGenerator._pending = (version, pending[1])
+            return
+        entry = (version, render)
+        SummaryImageGenerator._pending = entry
+
+        def run():
+            try:
+                self._render_once(inputs, render)
+                with SummaryImageGenerator._lock:
+                    # Unless a newer render was started meanwhile
+                    if SummaryImageGenerator._pending is entry:
+                        SummaryImageGenerator._current = entry
+            except Exception as e:
+                logger.error(f"Error generating image: {str(e)}")
+            finally:
+                with SummaryImageGenerator._lock:
+                    if SummaryImageGenerator._pending is entry:
+                        SummaryImageGenerator._pending = None
+
+        thread = threading.Thread(target=run, name='summary-image-render', daemon=True)
+        SummaryImageGenerator._render_thread = thread
+        thread.start()
+
+    def _render_once(self, inputs, render):
+        """
+        Single-flight render across threads and worker processes: the first
+        caller renders while holding the lock, the others wait for it and
+        then find the finished render directory.
+        """
+        with file_lock(os.path.join(self.renders_dir, '.lock'), timeout=self.RENDER_LOCK_TIMEOUT):
+            if os.path.isdir(render.directory):
+                return
+            self._write_render(inputs, render)
+
+    def _write_render(self, inputs, render):
+        """
+        Draw once, then encode every size and format into a temporary
+        directory that is renamed into place, so a render directory is
+        either complete or absent.
+        """
+        full = self.render(inputs)
+        tmp_dir = tempfile.mkdtemp(dir=self.renders_dir, prefix='.render-')
         try:
-            # Create image with white background
-            image = Image.new('RGB', (800, 600), 'white')
-            draw = ImageDraw.Draw(image)
-            
-            # Use default fonts to avoid encoding issues
+            for size, dimensions in self.SIZES.items():
+                image = full if dimensions == full.size else full.resize(dimensions, Image.LANCZOS)
+                for name in available_formats():
+                    pillow_format, _, options = self.FORMATS[name]
+                    path = os.path.join(tmp_dir, f"{size}.{name}")
+                    image.save(path, pillow_format, **options)
+                    os.chmod(path, 0o644)
+            # mkdtemp creates a 0700 directory; a front proxy must be able to read it
+            os.chmod(tmp_dir, 0o755)
+            self._publish_full_png(os.path.join(tmp_dir, 'full.png'))
             try:
-                # Try to load fonts, but fallback to default if any issue
-                title_font = ImageFont.truetype("arial.ttf", 32)
-                header_font = ImageFont.truetype("arial.ttf", 24)
-                body_font = ImageFont.truetype("arial.ttf", 18)
-            except:
-                # Use default font if there are any issues
-                title_font = ImageFont.load_default()
-                header_font = ImageFont.load_default()
-                body_font = ImageFont.load_default()
-            
-            # Get data
-            total_countries = Country.objects.count()
-            top_countries = Country.objects.exclude(
-                estimated_gdp__isnull=True
-            ).order_by('-estimated_gdp')[:5]
-            
-            status = SystemStatus.get_current_status()
-            
-            # Draw content
-            draw.text((50, 50), "Country GDP Summary", fill='black', font=title_font)
-            draw.text((50, 100), f"Total Countries: {total_countries}", fill='black', font=header_font)
-            draw.text((50, 130), f"Last Refresh: {status.last_refreshed_at}", fill='black', font=header_font)
-            draw.text((50, 180), "Top 5 Countries by GDP:", fill='black', font=header_font)
-            
-            y = 220
-            for i, country in enumerate(top_countries, 1):
-                gdp = f"${country.estimated_gdp:,.2f}" if country.estimated_gdp else "N/A"
-                text = f"{i}. {country.name}: {gdp}"
-                draw.text((70, y), text, fill='black', font=body_font)
-                y += 30
-            
-            # Save image as binary
-            image.save(self.image_path, 'PNG')
-            return True
-            
-        except Exception as e:
-            print(f"Error generating image: {str(e)}")
-            return False
-    
-    def image_exists(self):
-        """Check if summary image exists"""
-        return os.path.exists(self.image_path)
-    
-    def get_image_response(self):
-        """Return image as HTTP response"""
+                os.rename(tmp_dir, render.directory)
+            except OSError:
+                # Another process finished the same render first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self._remove_old_renders(keep=render.fingerprint)
+
+    def _publish_full_png(self, source):
+        """Copy the full size PNG to the stable path, replacing it atomically"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.image_path), prefix='.summary-', suffix='.png')
         try:
-            with open(self.image_path, 'rb') as f:
-                return HttpResponse(f.read(), content_type='image/png')
-        except Exception as e:
-            print(f"Error reading image: {str(e)}")
-            return None
+            with os.fdopen(fd, 'wb') as f, open(source, 'rb') as src:
+                shutil.copyfileobj(src, f)
+            # mkstemp creates 0600 files
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.image_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _remove_old_renders(self, keep):
+        """Keep the new render and the one served until now"""
+        current = SummaryImageGenerator._current
+        keep = {keep, current[1].fingerprint if current else None}
+        for name in os.listdir(self.renders_dir):
+            path = os.path.join(self.renders_dir, name)
+            if name.startswith('.render-'):
+                # Left behind by a renderer that died mid-render
+                try:
+                    if time.time() - os.path.getmtime(path) > self.STALE_RENDER_AGE:
+                        shutil.rmtree(path, ignore_errors=True)
+                except OSError:
+                    pass
+            elif name not in keep and not name.startswith('.'):
+                shutil.rmtree(path, ignore_errors=True)
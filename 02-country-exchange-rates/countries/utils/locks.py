@@ -0,0 +1,42 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def file_lock(path, timeout=30.0, poll_interval=0.05):
+    """
+    Exclusive advisory lock on path, shared across processes and threads
+    (every call opens its own file description). Yields True when the lock
+    is held, or False after timeout seconds or where flock isn't available;
+    callers must still be safe without it.
+    """
+    if fcntl is None:
+        yield False
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Timed out waiting for lock {path}")
+                    yield False
+                    return
+                time.sleep(poll_interval)
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,137 @@
+import struct
+import zlib
+from collections import defaultdict
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+
+class RateHistoryStore:
+    """
+    Per-currency exchange rate history, one row per currency per month.
+
+    A row's samples are stored as two packed arrays, zlib-compressed:
+    the seconds between consecutive samples (uint32, the first counted
+    from the start of the month), followed by the rates (float64). Regular
+    sampling makes the deltas nearly constant, so they compress to almost
+    nothing and a sample costs little more than its rate.
+    """
+
+    @staticmethod
+    def month_of(timestamp):
+        moment = datetime.fromtimestamp(timestamp, dt_timezone.utc)
+        return date(moment.year, moment.month, 1)
+
+    @staticmethod
+    def _month_start(month):
+        return int(datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc).timestamp())
+
+    @classmethod
+    def encode(cls, month, samples):
+        """Pack (unix time, rate) samples, sorted by time, of one month."""
+        previous = cls._month_start(month)
+        deltas = []
+        rates = []
+        for timestamp, rate in samples:
+            deltas.append(timestamp - previous)
+            rates.append(rate)
+            previous = timestamp
+        # Fixed-size little-endian fields, so the layout doesn't depend on the host
+        return zlib.compress(struct.pack(f'<{len(deltas)}I{len(rates)}d', *deltas, *rates))
+
+    @classmethod
+    def decode(cls, month, count, blob):
+        """Unpack a row's blob into a list of (unix time, rate) samples."""
+        values = struct.unpack(f'<{count}I{count}d', zlib.decompress(bytes(blob)))
+        samples = []
+        timestamp = cls._month_start(month)
+        for delta, rate in zip(values[:count], values[count:]):
+            timestamp += delta
+            samples.append((timestamp, rate))
+        return samples
+
+    @classmethod
+    def record(cls, series):
+        """
+        Append samples given as {currency_code: [(unix time, rate), ...]}.
+        Samples not newer than a row's last one are ignored. Reads the
+        affected rows with one query and writes them back in bulk.
+        """
+        from ..models import ExchangeRateHistory
+
+        pending = defaultdict(list)
+        for currency_code, samples in series.items():
+            for timestamp, rate in samples:
+                if rate is not None:
+                    pending[(currency_code, cls.month_of(timestamp))].append((int(timestamp), float(rate)))
+        if not pending:
+            return 0
+
+        months = {month for _, month in pending}
+        codes = {code for code, _ in pending}
+        existing = {
+            (row.currency_code, row.month): row
+            for row in ExchangeRateHistory.objects.filter(currency_code__in=codes, month__in=months)
+        }
+
+        to_create = []
+        to_update = []
+        appended = 0
+        # bulk_update() doesn't apply auto_now
+        updated_at = timezone.now()
+        for (currency_code, month), samples in pending.items():
+            row = existing.get((currency_code, month))
+            current = cls.decode(month, row.sample_count, row.samples) if row else []
+            last = row.last_timestamp if row else 0
+            new = []
+            for timestamp, rate in sorted(samples):
+                if timestamp > last:
+                    new.append((timestamp, rate))
+                    last = timestamp
+            if not new:
+                continue
+
+            if row is None:
+                row = ExchangeRateHistory(currency_code=currency_code, month=month)
+                to_create.append(row)
+            else:
+                to_update.append(row)
+            current += new
+            row.samples = cls.encode(month, current)
+            row.sample_count = len(current)
+            row.last_timestamp = last
+            row.updated_at = updated_at
+            appended += len(new)
+
+        ExchangeRateHistory.objects.bulk_create(to_create, batch_size=100)
+        ExchangeRateHistory.objects.bulk_update(
+            to_update, ['samples', 'sample_count', 'last_timestamp', 'updated_at'], batch_size=100
+        )
+        return appended
+
+    @classmethod
+    def record_rates(cls, rates, observed_at):
+        """Append one sample per currency from an exchange rate response."""
+        return cls.record({code: [(observed_at, rate)] for code, rate in rates.items()})
+
+    @classmethod
+    def read(cls, currency_code, start, end):
+        """
+        Samples of a currency between two aware datetimes (inclusive), as
+        (datetime, rate) pairs, read with one query on (currency_code, month).
+        """
+        from ..models import ExchangeRateHistory
+
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        rows = ExchangeRateHistory.objects.filter(
+            currency_code=currency_code,
+            month__gte=cls.month_of(start_ts),
+            month__lte=cls.month_of(end_ts),
+        ).order_by('month').values_list('month', 'sample_count', 'samples')
+
+        return [
+            (datetime.fromtimestamp(timestamp, dt_timezone.utc), rate)
+            for month, count, blob in rows
+            for timestamp, rate in cls.decode(month, count, blob)
+            if start_ts <= timestamp <= end_ts
+        ]
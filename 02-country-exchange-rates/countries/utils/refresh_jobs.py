@@ -0,0 +1,133 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .external_apis import DataRefreshService
+from .image_generator import SummaryImageGenerator
+from .snapshot import country_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshJobRunner:
+    """
+    Runs country refreshes in a background thread of the web process.
+
+    Jobs live in the refresh_jobs table, so any worker can report progress
+    for a job started by another. At most one job is active at a time: a
+    refresh requested while another is pending or running returns the
+    existing job instead of starting a new one.
+    """
+
+    # An active job that hasn't reported progress for this long is assumed
+    # to belong to a worker that died, and is released.
+    STALE_AFTER = timedelta(minutes=10)
+
+    @classmethod
+    def submit(cls, force=False, background=True):
+        """
+        Queue a refresh. Returns (job, created).
+        With background=False the caller is expected to run() the new job itself.
+        """
+        from ..models import RefreshJob
+
+        cls._release_stale_job()
+        try:
+            with transaction.atomic():
+                job = RefreshJob.objects.create(force=force)
+        except IntegrityError:
+            active = RefreshJob.objects.filter(active_key=RefreshJob.ACTIVE_KEY).first()
+            if active is None:
+                # The active job finished in the meantime; try once more
+                return cls.submit(force, background)
+            return active, False
+
+        if background:
+            transaction.on_commit(lambda: cls.start(job.pk))
+        return job, True
+
+    @classmethod
+    def start(cls, job_id):
+        thread = threading.Thread(
+            target=cls.run, args=(job_id,), name=f"refresh-job-{job_id}", daemon=True
+        )
+        thread.start()
+        return thread
+
+    @classmethod
+    def run(cls, job_id):
+        """Execute a queued job: refresh data, regenerate the image, record the outcome."""
+        from ..models import RefreshJob
+
+        close_old_connections()
+        try:
+            RefreshJob.objects.filter(pk=job_id).update(
+                status=RefreshJob.STATUS_RUNNING,
+                started_at=timezone.now(),
+                updated_at=timezone.now(),
+            )
+            job = RefreshJob.objects.get(pk=job_id)
+
+            def progress(stage, processed, total):
+                RefreshJob.objects.filter(pk=job_id).update(
+                    stage=stage, processed=processed, total=total, updated_at=timezone.now()
+                )
+
+            result = DataRefreshService.refresh_country_data(force=job.force, progress=progress)
+
+            if not result["up_to_date"]:
+                progress("rendering_image", result["total_processed"], result["total_processed"])
+                SummaryImageGenerator().generate_image()
+                cls.warm_list_cache()
+
+            RefreshJob.objects.filter(pk=job_id).update(
+                status=RefreshJob.STATUS_SUCCEEDED,
+                stage="done",
+                result=result,
+                active_key=None,
+                finished_at=timezone.now(),
+                updated_at=timezone.now(),
+            )
+        except Exception as e:
+            logger.error(f"Refresh job {job_id} failed: {str(e)}")
+            RefreshJob.objects.filter(pk=job_id).update(
+                status=RefreshJob.STATUS_FAILED,
+                error=str(e),
+                active_key=None,
+                finished_at=timezone.now(),
+                updated_at=timezone.now(),
+            )
+        finally:
+            connection.close()
+
+    @staticmethod
+    def warm_list_cache():
+        """
+        Pre-render this process's most requested country lists from the new
+        data. Other workers do the same for their own lists when they see
+        the new data version.
+        """
+        if not settings.COUNTRY_SNAPSHOT_ENABLED:
+            return
+        try:
+            country_snapshot.warm()
+        except Exception as e:
+            logger.warning(f"Could not warm country list cache: {str(e)}")
+
+    @classmethod
+    def _release_stale_job(cls):
+        from ..models import RefreshJob
+
+        RefreshJob.objects.filter(
+            active_key=RefreshJob.ACTIVE_KEY,
+            updated_at__lt=timezone.now() - cls.STALE_AFTER,
+        ).update(
+            status=RefreshJob.STATUS_FAILED,
+            error="Refresh job stopped reporting progress",
+            active_key=None,
+            finished_at=timezone.now(),
+        )
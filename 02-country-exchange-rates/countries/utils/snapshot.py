@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from ..filters import DEFAULT_SORT, SORT_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class CountryRecord:
+    """ One country as needed to filter and sort the list in memory """
+
+    __slots__ = ('pk', 'region', 'currency_code', 'population', 'estimated_gdp', 'name_rank', 'payload')
+
+    def __init__(self, row, name_rank, payload):
+        self.pk = row['id']
+        self.region = row['region'].casefold() if row['region'] else None
+        self.currency_code = row['currency_code']
+        self.population = row['population']
+        self.estimated_gdp = row['estimated_gdp']
+        # Position in the database's own name ordering, so ties and name sorts
+        # follow the database collation
+        self.name_rank = name_rank
+        # Serialized country, shared by every response that includes it
+        self.payload = payload
+
+
+def _sort_key(spec):
+    """ Python sort key equivalent to sort_ordering() for one sort option """
+    def key(record):
+        parts = []
+        for field, descending in spec:
+            if field == 'name':
+                parts.append(-record.name_rank if descending else record.name_rank)
+                continue
+            value = getattr(record, field)
+            if value is None:
+                parts.append((1, 0))
+            else:
+                parts.append((0, -value if descending else value))
+        return tuple(parts)
+    return key
+
+
+class CountrySnapshot:
+    """
+    Immutable copy of the countries table with the list pre-sorted for
+    every sort option of CountryFilter.
+    """
+
+    # Without a sort parameter the database returns rows in primary key order
+    SORT_KEYS = {
+        None: lambda r: r.pk,
+        **{sort: _sort_key(spec) for sort, spec in SORT_OPTIONS.items()},
+    }
+    DEFAULT_SORT = DEFAULT_SORT
+
+    def __init__(self, version, records):
+        self.version = version
+        self.orderings = {
+            sort: sorted(records, key=key) for sort, key in self.SORT_KEYS.items()
+        }
+        # Rendered list responses keyed by normalized query; discarded with
+        # the snapshot, so a refresh invalidates every entry at once
+        self.rendered = {}
+
+    @classmethod
+    def normalize(cls, params, fields=None):
+        """
+        Reduce query parameters to the ones that affect the list, in
+        canonical form. fields is the parsed fields= parameter, if any.
+        """
+        region = params.get('region')
+        currency = params.get('currency')
+        sort = params.get('sort')
+        if sort and sort not in cls.SORT_KEYS:
+            sort = cls.DEFAULT_SORT
+        return (
+            region.casefold() if region else None,
+            currency.casefold() if currency else None,
+            params.get('currency_code') or None,
+            sort or None,
+            fields,
+        )
+
+    def filter(self, params, fields=None):
+        """ Apply CountryFilter's region, currency and sort parameters, and the fields selection """
+        return self._filter(self.normalize(params, fields))
+
+    def _filter(self, key):
+        region, currency, currency_code, sort, fields = key
+        records = self.orderings[sort]
+        if region:
+            records = [r for r in records if r.region == region]
+        if currency:
+            records = [r for r in records if r.currency_code and r.currency_code.casefold() == currency]
+        if currency_code:
+            records = [r for r in records if r.currency_code == currency_code]
+        if fields:
+            return [{field: r.payload[field] for field in fields} for r in records]
+        return [r.payload for r in records]
+
+    def render(self, key):
+        """ Return (JSON bytes, payloads) for a normalized query, rendering it at most once """
+        entry = self.rendered.get(key)
+        if entry is None:
+            data = self._filter(key)
+            entry = (JSONRenderer().render(data), data)
+            if len(self.rendered) < settings.COUNTRY_LIST_CACHE_SIZE:
+                self.rendered[key] = entry
+        return entry
+
+
+class SnapshotStore:
+    """
+    Process-wide holder of the current CountrySnapshot.
+
+    The stored data version is read at most once per
+    COUNTRY_SNAPSHOT_CHECK_INTERVAL seconds; the snapshot is rebuilt when
+    it has moved on (another process refreshed or deleted countries) or
+    when this process changed countries itself (see invalidate()). A
+    rebuilt snapshot has this process's most requested lists rendered
+    before it replaces the old one, whichever process made the change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+        # Incremented by invalidate(), so a load racing a change is discarded
+        self._generation = 0
+        # How often each normalized query was listed, to pick what to warm up
+        self._popularity = Counter()
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+
+    def get(self):
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < settings.COUNTRY_SNAPSHOT_CHECK_INTERVAL:
+            return snapshot
+
+        version = self._current_version()
+        if snapshot is not None and snapshot.version == version:
+            self._checked_at = now
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is not None and self._snapshot.version == version:
+                return self._snapshot
+            generation = self._generation
+
+        snapshot = self._load(version)
+        self._warm(snapshot)
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._checked_at = now
+        return snapshot
+
+    def render(self, params, fields=None):
+        key = CountrySnapshot.normalize(params, fields)
+        with self._lock:
+            if key in self._popularity or len(self._popularity) < settings.COUNTRY_LIST_CACHE_SIZE:
+                self._popularity[key] += 1
+        return self.get().render(key)
+
+    def warm(self):
+        """ Load the current snapshot with the most requested lists rendered, e.g. right after a refresh """
+        self._warm(self.get())
+
+    def _warm(self, snapshot):
+        count = settings.COUNTRY_LIST_WARM_UP
+        if not count:
+            return
+        with self._lock:
+            popular = [key for key, _ in self._popularity.most_common(count)]
+        for key in popular:
+            snapshot.render(key)
+
+    @staticmethod
+    def _current_version():
+        from ..models import SystemStatus
+
+        return SystemStatus.objects.filter(pk=1).values_list('data_version', 'last_refreshed_at').first()
+
+    @staticmethod
+    def _load(version):
+        from ..models import Country
+        from ..serializers import CountryListSerializer
+
+        started = time.perf_counter()
+        rows = list(Country.objects.order_by('name').values(*CountryListSerializer.FIELDS))
+        payloads = CountryListSerializer().serialize(rows)
+        records = [
+            CountryRecord(row, rank, payload)
+            for rank, (row, payload) in enumerate(zip(rows, payloads))
+        ]
+        snapshot = CountrySnapshot(version, records)
+        logger.info(
+            f"Loaded country snapshot with {len(records)} countries "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return snapshot
+
+
+country_snapshot = SnapshotStore()
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+
+class StatusCache:
+    """
+    Process-wide copy of the rendered /status response.
+
+    The status row is re-read at most once per STATUS_CACHE_TTL seconds, so
+    polling by load balancers costs no queries in between. Changes made in
+    this process (a refresh or delete saving SystemStatus) invalidate it
+    immediately through signals; other processes' changes show up within
+    the TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = None
+        self._loaded_at = 0.0
+        # Incremented by invalidate(), so a load racing a change is discarded
+        self._generation = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
+            self._generation += 1
+
+    def get(self):
+        """ Return (JSON bytes, data) of the current status """
+        entry = self._entry
+        now = time.monotonic()
+        if entry is not None and now - self._loaded_at < settings.STATUS_CACHE_TTL:
+            return entry
+
+        entry = None
+        while entry is None:
+            with self._lock:
+                generation = self._generation
+            entry = self._load()
+        with self._lock:
+            if generation == self._generation:
+                self._entry = entry
+                self._loaded_at = now
+        return entry
+
+    @staticmethod
+    def _load():
+        from ..models import SystemStatus
+        from ..serializers import SystemStatusSerializer
+
+        status = SystemStatus.objects.filter(pk=1).values('total_countries', 'last_refreshed_at').first()
+        if status is None:
+            # First request ever: create the row (counting countries once).
+            # Saving it invalidates this cache, so the caller reads it again.
+            SystemStatus.get_current_status()
+            return None
+        data = SystemStatusSerializer(status).data
+        return JSONRenderer().render(data), data
+
+
+status_cache = StatusCache()
@@ -0,0 +1,75 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, NamedTuple, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FetchResult(NamedTuple):
+    """Upstream data plus whether it differs from what was last applied."""
+
+    data: object
+    changed: bool
+    # Entry to persist once the data has been written to the database
+    cache_entry: Optional[Dict] = None
+
+
+class UpstreamCache:
+    """
+    Last successful upstream response persisted on disk together with its
+    validators (ETag / Last-Modified) and any upstream metadata, so the next
+    refresh can send a conditional request or skip the request entirely.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def path(self):
+        return os.path.join(settings.CACHE_DIR, 'upstream', f'{self.name}.json')
+
+    def load(self) -> Optional[Dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable upstream cache {self.path}: {str(e)}")
+            return None
+
+    def save(self, entry: Dict):
+        """Write the entry atomically so readers never see a partial file."""
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{self.name}-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict:
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    @staticmethod
+    def make_entry(body, response, **meta) -> Dict:
+        return {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'meta': meta,
+            'body': body,
+        }
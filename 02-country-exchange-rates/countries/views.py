@@ -1,13 +1,33 @@
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from django.conf import settings
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
+from datetime import datetime, time, timedelta, timezone as dt_timezone
 import logging
 
-from .models import Country, SystemStatus
-from .serializers import CountrySerializer, SystemStatusSerializer
-from .utils.external_apis import DataRefreshService, ExternalAPIError
-from .utils.image_generator import SummaryImageGenerator
+from .models import Country, CurrencyAggregate, RefreshJob, RegionAggregate, SystemStatus
+from .pagination import CountryCursorPagination
+from .responses import IgnoreAcceptNegotiation, NDJSONRenderer, PrerenderedResponse, file_response, ndjson_response
+from .serializers import (
+    CountryListSerializer,
+    CountrySerializer,
+    CurrencyAggregateSerializer,
+    RefreshJobSerializer,
+    RegionAggregateSerializer,
+)
+from .utils.aggregates import AggregateBuilder
+from .utils.rate_history import RateHistoryStore
+from .utils.refresh_jobs import RefreshJobRunner
+from .utils.snapshot import country_snapshot
+from .utils.status_cache import status_cache
+from .utils.image_generator import SummaryImageGenerator, negotiate_format
 from .filters import CountryFilter
 
 logger = logging.getLogger(__name__)
@@ -22,14 +42,59 @@ class CountryViewSet(viewsets.ModelViewSet):
     # ordering = ['name']
     lookup_field = 'name'
     lookup_url_kwarg = 'name'
+    pagination_class = CountryCursorPagination
+    renderer_classes = [JSONRenderer, NDJSONRenderer]
+    # Rows per database fetch and per write when streaming NDJSON
+    STREAM_CHUNK_SIZE = 500
 
     def get_serializer_class(self):
         return CountrySerializer
     
     def list(self, request, *args, **kwargs):
-        """Get all countries with filtering and sorting"""
+        """Get all countries with filtering and sorting, optionally only some fields (?fields=name,region)"""
         try:
-            return super().list(request, *args, **kwargs)
+            fields = CountryListSerializer.parse_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return Response(
+                {"error": f"Unknown fields: {e}. Available fields: {', '.join(CountryListSerializer.FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        streaming = request.accepted_renderer.format == NDJSONRenderer.format
+        paginating = self.paginator.is_requested(request)
+        try:
+            if settings.COUNTRY_SNAPSHOT_ENABLED and not (streaming or paginating):
+                content, data = country_snapshot.render(request.query_params, fields)
+                return PrerenderedResponse(content, data)
+
+            # Select only the requested columns (plus the cursor's sort
+            # keys) and skip the model serializer
+            serializer = CountryListSerializer(fields)
+            columns = list(serializer.fields)
+            sort = self.paginator.sort_of(request)
+            if paginating or streaming:
+                columns += self.paginator.key_fields(sort)
+            rows = self.filter_queryset(self.get_queryset()).values(*dict.fromkeys(columns))
+            try:
+                page = self.paginate_queryset(rows)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if streaming:
+                # Read in keyset chunks rather than with .iterator(), which
+                # mysqlclient would buffer in full
+                rows = page if page is not None else self.paginator.iterate(rows, sort, self.STREAM_CHUNK_SIZE)
+                response = ndjson_response(
+                    (serializer.to_representation(row) for row in rows), chunk_size=self.STREAM_CHUNK_SIZE
+                )
+                next_link = self.paginator.get_next_link()
+                if next_link:
+                    response['Link'] = f'<{next_link}>; rel="next"'
+                return response
+
+            if page is not None:
+                return self.get_paginated_response(serializer.serialize(page))
+            return Response(serializer.serialize(rows))
         except Exception as e:
             logger.error(f"Error listing countries: {str(e)}")
             return Response(
@@ -41,7 +106,7 @@ class CountryViewSet(viewsets.ModelViewSet):
         """Get one country by name"""
         try:
             name = kwargs.get('name')
-            instance = Country.objects.get(name__iexact=name)
+            instance = Country.objects.get(name_key=Country.normalize_name(name))
             serializer = self.get_serializer(instance)
             return Response(serializer.data)
         except Country.DoesNotExist:
@@ -55,12 +120,31 @@ class CountryViewSet(viewsets.ModelViewSet):
                 {"error": "Internal server error"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-            
+
+    def perform_create(self, serializer):
+        # Fetched first: a status row created now doesn't count the new country yet
+        system_status = SystemStatus.get_current_status()
+        serializer.save()
+        AggregateBuilder.rebuild()
+        system_status.bump_data_version(count_delta=1)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        AggregateBuilder.rebuild()
+        SystemStatus.get_current_status().bump_data_version(count_delta=0)
+
+    def perform_destroy(self, instance):
+        # Fetched first: a status row created now counts the country being deleted
+        system_status = SystemStatus.get_current_status()
+        instance.delete()
+        AggregateBuilder.rebuild()
+        system_status.bump_data_version(count_delta=-1)
+
     def destroy (self, request, *args, **kwargs):
         """Delete a country record"""
         try:
             name = kwargs.get('name')
-            instance = Country.objects.get(name__iexact=name)
+            instance = Country.objects.get(name_key=Country.normalize_name(name))
             self.perform_destroy(instance)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Country.DoesNotExist:
@@ -77,64 +161,179 @@ class CountryViewSet(viewsets.ModelViewSet):
         
     @action(detail=False, methods=['post'])
     def refresh(self, request):
-        """ Fetch all countries and exchange rates, then cache them in the database """
+        """ Queue a background refresh of countries and exchange rates """
         try:
-            result = DataRefreshService.refresh_country_data()
-            
-            # Generate summary image after refresh
-            image_generator = SummaryImageGenerator()
-            image_generator.generate_image()
-            
-            return Response({
-                "message": "Country data refreshed successfully.",
-                "data": result
-            })
-        except ExternalAPIError as e:
-            return Response({
-                "error": "External data source unavailable",
-                "details": str(e)   
+            force = request.query_params.get('force', '').lower() in ('true', '1')
+            job, created = RefreshJobRunner.submit(force=force)
+
+            response = Response({
+                "message": (
+                    "Refresh job queued."
+                    if created
+                    else "Refresh already in progress."
+                ),
+                "data": RefreshJobSerializer(job).data
             },
-            status=status.HTTP_503_SERVICE_UNAVAILABLE
+            status=status.HTTP_202_ACCEPTED
         )
+            response['Location'] = request.build_absolute_uri(
+                reverse('country-refresh-status', kwargs={'job_id': job.pk})
+            )
+            return response
         except Exception as e:
-            logger.error(f"Error refreshing country data: {str(e)}")
+            logger.error(f"Error queueing country refresh: {str(e)}")
             return Response(
                 {"error": "Internal server error."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-        
+
+    @action(detail=False, methods=['get'], url_path=r'refresh/(?P<job_id>[0-9]+)')
+    def refresh_status(self, request, job_id=None):
+        """ Progress and outcome of a refresh job """
+        try:
+            job = RefreshJob.objects.get(pk=job_id)
+            return Response(RefreshJobSerializer(job).data)
+        except RefreshJob.DoesNotExist:
+            return Response(
+                {"error": "Refresh job not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+    # Range returned by /countries/<name>/rates when from is not given
+    RATE_HISTORY_DEFAULT_DAYS = 30
+
+    @staticmethod
+    def _parse_moment(value, end_of_day=False):
+        """ ISO 8601 datetime, or date meaning the start (or end) of that day, in UTC """
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(value)
+            moment = datetime.combine(day, time.max if end_of_day else time.min)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment, dt_timezone.utc)
+        return moment
+
+    @action(detail=True, methods=['get'])
+    def rates(self, request, name=None):
+        """ Exchange rate history of a country's currency between ?from= and ?to= """
+        try:
+            end = request.query_params.get('to')
+            end = self._parse_moment(end, end_of_day=True) if end else timezone.now()
+            start = request.query_params.get('from')
+            start = self._parse_moment(start) if start else end - timedelta(days=self.RATE_HISTORY_DEFAULT_DAYS)
+        except ValueError:
+            return Response(
+                {"error": "from and to must be ISO 8601 dates or datetimes"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end:
+            return Response(
+                {"error": "from must not be later than to"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            currency_code = Country.objects.filter(
+                name_key=Country.normalize_name(name)
+            ).values_list('currency_code', flat=True).get()
+        except Country.DoesNotExist:
+            return Response(
+                {"error": "Country not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            samples = RateHistoryStore.read(currency_code, start, end) if currency_code else []
+            return Response({
+                "currency_code": currency_code,
+                "from": start,
+                "to": end,
+                "rates": [{"timestamp": moment, "rate": rate} for moment, rate in samples],
+            })
+        except Exception as e:
+            logger.error(f"Error retrieving exchange rate history: {str(e)}")
+            return Response(
+                {"error": "Internal server error."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    # group_by value: (rollup model, serializer, grouped column). The query
+    # parameter of the same name as group_by narrows the result to one row.
+    AGGREGATES = {
+        'region': (RegionAggregate, RegionAggregateSerializer, 'region'),
+        'currency': (CurrencyAggregate, CurrencyAggregateSerializer, 'currency_code'),
+    }
+
     @action(detail=False, methods=['get'])
+    def aggregates(self, request):
+        """ Population, GDP and country totals per region or currency, read from the rollup tables """
+        group_by = request.query_params.get('group_by', 'region')
+        if group_by not in self.AGGREGATES:
+            return Response(
+                {"error": f"group_by must be one of: {', '.join(self.AGGREGATES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            model, serializer_class, column = self.AGGREGATES[group_by]
+            rows = model.objects.all()
+            value = request.query_params.get(group_by)
+            if value:
+                rows = rows.filter(**{f'{column}__iexact': value})
+            return Response(serializer_class(rows, many=True).data)
+        except Exception as e:
+            logger.error(f"Error retrieving country aggregates: {str(e)}")
+            return Response(
+                {"error": "Internal server error."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['get'], content_negotiation_class=IgnoreAcceptNegotiation)
     def image(self, request):
-        """Serve the generated summary image"""
-        image_generator = SummaryImageGenerator()
-        
-        # If image doesn't exist, try to generate it first
-        if not image_generator.image_exists():
-            # Try to generate the image
-            if not image_generator.generate_image():
+        """Serve the generated summary image, in the size asked for and the best format the client accepts"""
+        size = request.query_params.get('size', 'full')
+        if size not in SummaryImageGenerator.SIZES:
+            return Response(
+                {"error": f"size must be one of: {', '.join(SummaryImageGenerator.SIZES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        image_format = negotiate_format(request.META.get('HTTP_ACCEPT'))
+
+        # Out-of-date images are redrawn in the background; only the very
+        # first request waits for a render
+        image = SummaryImageGenerator().get_image(size, image_format, wait=False)
+        if image is None:
+            return Response(
+                {"error": "Summary image not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        etag = quote_etag(image.etag)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(image.last_modified.timestamp())
+        )
+        if response is None:
+            try:
+                response = file_response(request, image.path, image.content_type, etag=etag)
+            except FileNotFoundError:
                 return Response(
                     {"error": "Summary image not found"},
                     status=status.HTTP_404_NOT_FOUND
                 )
-        
-        # Get image response
-        response = image_generator.get_image_response()
-        if response:
-            return response
-        else:
-            return Response(
-                {"error": "Internal server error"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        
-    
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(image.last_modified.timestamp())
+        patch_cache_control(response, public=True, max_age=settings.SUMMARY_IMAGE_MAX_AGE)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+
 class StatusViewSet(viewsets.ViewSet):
     def list(self, request):
         """ Show total countries and last updated timestamp """
         try:
-            status_obj = SystemStatus.get_current_status()
-            serializer = SystemStatusSerializer(status_obj)
-            return Response(serializer.data)
+            content, data = status_cache.get()
+            return PrerenderedResponse(content, data)
         except Exception as e:
             logger.error(f"Error retrieving system status: {str(e)}")
             return Response(